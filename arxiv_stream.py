@@ -0,0 +1,129 @@
+import os
+import re
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import http_client
+import metrics
+
+# ArXiv API 的流式 Atom 读取：
+# 响应体按块喂给增量 XML 解析器，每解析完一个 <entry> 就产出一篇论文并从树上摘掉，
+# 不管一页多少条，内存里只有当前这一篇；调用方不再迭代时剩下的响应直接丢弃。
+# 多页结果 (start=0, 100, 200 ...) 并发发起请求，但按页顺序产出，遇到已见过 / 超过时间窗口的论文就停止
+
+# ================= 配置 =================
+ARXIV_API = "http://export.arxiv.org/api/query"
+ARXIV_PAGE_SIZE = int(os.getenv("ARXIV_PAGE_SIZE", "100"))
+# 官方建议不要高频并发请求，这里默认只同时开 2 页
+ARXIV_PAGE_WORKERS = int(os.getenv("ARXIV_PAGE_WORKERS", "2"))
+# =======================================
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+ARXIV = "{http://arxiv.org/schemas/atom}"
+VERSION_RE = re.compile(r'v\d+$')
+
+def _text(elem, tag):
+    child = elem.find(tag)
+    return " ".join((child.text or "").split()) if child is not None else ""
+
+def parse_entry(elem):
+    """<entry> 元素转成 dict"""
+    abs_url = _text(elem, ATOM + "id")
+    pdf_url = abs_url
+    for link in elem.findall(ATOM + "link"):
+        if link.get("title") == "pdf":
+            pdf_url = link.get("href")
+    published = _text(elem, ATOM + "published")
+    primary = elem.find(ARXIV + "primary_category")
+    return {
+        # http://arxiv.org/abs/2410.12345v2 -> 2410.12345 (去掉版本号，改版后不算新论文)
+        "id": VERSION_RE.sub("", abs_url.rsplit("/abs/", 1)[-1]),
+        "title": _text(elem, ATOM + "title"),
+        "summary": _text(elem, ATOM + "summary"),
+        "authors": [_text(a, ATOM + "name") for a in elem.findall(ATOM + "author")],
+        "categories": [c.get("term") for c in elem.findall(ATOM + "category")],
+        "primary_category": primary.get("term") if primary is not None else None,
+        "published": datetime.strptime(published, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc) if published else None,
+        "link": abs_url,
+        "pdf": pdf_url,
+    }
+
+def iter_entries(chunks):
+    """
+    增量解析 Atom 文档 (chunks 是字节块的迭代器，比如 resp.iter_content())
+    逐条产出论文 dict，解析过的 <entry> 立即从树上移除
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    root = None
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, elem in parser.read_events():
+            if event == "start":
+                if root is None:
+                    root = elem
+            elif elem.tag == ATOM + "entry":
+                yield parse_entry(elem)
+                root.remove(elem)
+    parser.close()
+
+def _open_page(query, start, page_size, timeout):
+    params = {
+        "search_query": query,
+        "sortBy": "submittedDate",
+        "sortOrder": "descending",
+        "start": start,
+        "max_results": page_size,
+    }
+    resp = http_client.get(ARXIV_API, params=params, timeout=timeout, stream=True)
+    resp.raise_for_status()
+    return resp
+
+def iter_recent(query, max_results, seen=None, cutoff=None, page_size=None, workers=None, timeout=(5, 30)):
+    """
+    按提交时间从新到旧产出论文，最多 max_results 篇
+    seen: 已经推送过的论文 id，遇到就停止 (更早的肯定也处理过了)
+    cutoff: datetime，遇到比它早提交的论文就停止
+    """
+    page_size = page_size or ARXIV_PAGE_SIZE
+    workers = max(1, workers or ARXIV_PAGE_WORKERS)
+    seen = seen or ()
+    starts = list(range(0, max_results, page_size))
+    pool = ThreadPoolExecutor(max_workers=min(workers, len(starts)))
+    # 最多比当前页多提前打开 workers - 1 页，停止时不会白白拉一堆页面
+    futures = {}
+    try:
+        for i, start in enumerate(starts):
+            for ahead in starts[i:i + workers]:
+                if ahead not in futures:
+                    futures[ahead] = pool.submit(metrics.bind(_open_page), query, ahead, min(page_size, max_results - ahead), timeout)
+            resp = futures.pop(start).result()
+            count = 0
+            try:
+                for entry in iter_entries(resp.iter_content(chunk_size=64 * 1024)):
+                    count += 1
+                    if entry["id"] in seen:
+                        print(f"🛑 ArXiv 读到已推送过的论文 {entry['id']}，停止翻页")
+                        return
+                    if cutoff and entry["published"] and entry["published"] < cutoff:
+                        print(f"🛑 ArXiv 读到 {cutoff:%m-%d %H:%M} 之前的论文，停止翻页")
+                        return
+                    yield entry
+            finally:
+                resp.close()
+            if count < page_size:
+                return  # 最后一页
+    finally:
+        # 提前打开但没读的页面：还没开始的取消，已经在请求的等返回后关闭连接
+        for future in futures.values():
+            if not future.cancel():
+                future.add_done_callback(_close_page)
+        pool.shutdown(wait=False)
+
+def _close_page(future):
+    if not future.exception():
+        future.result().close()
+
+def cutoff_hours(hours):
+    """hours 小时之前的 UTC 时间"""
+    return datetime.now(timezone.utc) - timedelta(hours=hours)
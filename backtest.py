@@ -0,0 +1,209 @@
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import local_store
+import trade_store
+
+# 选股回测：
+# 读取 trade_store 里归档的 龙头/补涨 记录，关联本地缓存的日线行情，
+# 用数组运算一次性算出所有记录的 1/3/5 日远期收益、胜率和最大回撤
+
+# ================= 配置 =================
+HORIZONS = (1, 3, 5)
+PRICE_CACHE_DIR = "prices"
+# 每只股票已经下载过的日期区间 {代码: [起, 止]}：按请求的区间判断缓存是否够用，
+# 不看行情里实际出现的最早/最晚日期 (end 落在周末、节假日时永远对不上)
+PRICE_RANGES = "prices/ranges.json"
+# 收盘后当天的日线才算最终数据
+MARKET_CLOSE = "15:30"
+BACKTEST_REPORT = os.getenv("BACKTEST_REPORT", "backtest_report.md")
+# =======================================
+
+def _ak():
+    # akshare 很重，只在真正需要下载行情时才导入
+    import akshare as ak
+    return ak
+
+def _price_file(code):
+    return local_store.cache_path(PRICE_CACHE_DIR, f"{code}.parquet")
+
+def settled_through(end):
+    """end 之前 (含) 已经定型的最后一天：今天还没收盘的话只到昨天"""
+    now = datetime.now()
+    last = now if now.strftime('%H:%M') >= MARKET_CLOSE else now - timedelta(days=1)
+    return min(end, last.strftime('%Y-%m-%d'))
+
+def load_prices(code, start, end, refresh=True):
+    """
+    读取单只股票的日线 (日期, 收盘, 最低)，已下载的区间没覆盖 [start, end] 时才去下载
+    """
+    path = _price_file(code)
+    cached = pd.read_parquet(path) if os.path.exists(path) else None
+    if cached is not None and cached.empty:
+        cached = None
+    ranges = local_store.load_json(PRICE_RANGES, {})
+    fetched = ranges.get(code)
+    if fetched is None and cached is not None:
+        # 旧缓存没有记录下载区间，先按实际日期估计
+        fetched = [cached['日期'].min(), cached['日期'].max()]
+    settled = settled_through(end)
+    covered = cached is not None and fetched[0] <= start and fetched[1] >= settled
+    if covered or not refresh:
+        return cached
+
+    try:
+        df = _ak().stock_zh_a_hist(symbol=code, period="daily",
+                                   start_date=start.replace('-', ''), end_date=end.replace('-', ''), adjust="qfq")
+    except Exception as e:
+        print(f"⚠️ {code} 行情下载失败: {e}")
+        return cached
+    if df is None or df.empty:
+        return cached
+    df = pd.DataFrame({
+        '日期': pd.to_datetime(df['日期']).dt.strftime('%Y-%m-%d'),
+        '收盘': pd.to_numeric(df['收盘'], errors='coerce'),
+        '最低': pd.to_numeric(df['最低'], errors='coerce'),
+    })
+    if cached is not None:
+        df = pd.concat([cached, df]).drop_duplicates('日期', keep='last')
+    df = df.sort_values('日期').reset_index(drop=True)
+    df.to_parquet(path, index=False)
+    # 和之前的区间有重叠就合并，否则只记这次下载的区间
+    if fetched and cached is not None and fetched[0] <= settled and fetched[1] >= start:
+        ranges[code] = [min(start, fetched[0]), max(settled, fetched[1])]
+    else:
+        ranges[code] = [start, settled]
+    local_store.save_json(PRICE_RANGES, ranges)
+    return df
+
+def load_price_table(picks, refresh=True):
+    """把所有涉及到的股票的日线拼成一张表: 代码, 日期, 收盘, 最低"""
+    if picks.empty:
+        return pd.DataFrame(columns=['代码', '日期', '收盘', '最低'])
+    start = picks['日期'].min()
+    # 需要看到最后一条记录之后 max(HORIZONS) 个交易日，按自然日多留一些余量
+    end_dt = datetime.strptime(picks['日期'].max(), '%Y-%m-%d') + timedelta(days=max(HORIZONS) * 2 + 7)
+    end = min(end_dt, datetime.now()).strftime('%Y-%m-%d')
+
+    frames = []
+    for code in picks['代码'].unique():
+        df = load_prices(code, start, end, refresh=refresh)
+        if df is not None and not df.empty:
+            frames.append(df.assign(代码=code))
+    if not frames:
+        return pd.DataFrame(columns=['代码', '日期', '收盘', '最低'])
+    return pd.concat(frames, ignore_index=True)
+
+def compute_forward_returns(picks, prices, horizons=HORIZONS):
+    """
+    向量化计算每条选股记录的远期收益和回撤
+    picks: 至少包含 日期, 代码, 买入价
+    prices: 代码, 日期, 收盘, 最低
+    返回 picks 加上 ret_{h}d / hit_{h}d 和 drawdown 列 (行情不足的为 NaN)
+    """
+    prices = prices.sort_values(['代码', '日期'], kind='stable').reset_index(drop=True)
+    n = len(prices)
+    codes = prices['代码'].to_numpy()
+    close = prices['收盘'].to_numpy(dtype='float64')
+    low = prices['最低'].to_numpy(dtype='float64')
+
+    # 每一行所在股票分组的结束位置，用来判断 pos + h 是否越界到下一只股票
+    if n:
+        starts = np.r_[0, np.flatnonzero(codes[1:] != codes[:-1]) + 1]
+        ends = np.r_[starts[1:], n]
+        group_end = np.repeat(ends, ends - starts)
+    else:
+        group_end = np.zeros(0, dtype=np.int64)
+
+    keys = pd.DataFrame({'代码': codes, '日期': prices['日期'].to_numpy(), '_pos': np.arange(n)})
+    result = picks.reset_index(drop=True).merge(keys, on=['代码', '日期'], how='left')
+    found = result['_pos'].notna().to_numpy()
+    pos = result['_pos'].fillna(-1).to_numpy(dtype=np.int64)
+    buy = pd.to_numeric(result['买入价'], errors='coerce').to_numpy(dtype='float64')
+    pick_end = np.where(found, group_end[np.clip(pos, 0, None)] if n else 0, 0)
+
+    for h in horizons:
+        target = pos + h
+        valid = found & (target < pick_end)
+        ret = np.full(len(result), np.nan)
+        ret[valid] = close[target[valid]] / buy[valid] - 1
+        result[f'ret_{h}d'] = ret
+        result[f'hit_{h}d'] = np.where(np.isnan(ret), np.nan, ret > 0)
+
+    # 最大回撤: 持有 max(horizons) 天内最低价相对买入价的跌幅
+    window = max(horizons)
+    offsets = np.arange(window + 1)
+    idx = pos[:, None] + offsets[None, :]
+    in_range = found[:, None] & (idx < pick_end[:, None])
+    lows = np.where(in_range, low[np.clip(idx, 0, max(n - 1, 0))] if n else np.nan, np.nan)
+    with np.errstate(invalid='ignore'):
+        min_low = np.where(in_range.any(axis=1), np.nanmin(np.where(in_range, lows, np.inf), axis=1), np.nan)
+    result['drawdown'] = np.minimum(min_low / buy - 1, 0)
+    return result.drop(columns=['_pos'])
+
+def summarize(result, by, horizons=HORIZONS):
+    """按 by (类型 / 板块) 汇总: 记录数、平均收益、胜率、平均/最差回撤"""
+    agg = {'picks': ('代码', 'size')}
+    for h in horizons:
+        agg[f'avg_{h}d'] = (f'ret_{h}d', 'mean')
+        agg[f'hit_{h}d'] = (f'hit_{h}d', 'mean')
+    agg['avg_dd'] = ('drawdown', 'mean')
+    agg['max_dd'] = ('drawdown', 'min')
+    return result.groupby(by, sort=False).agg(**agg).sort_values('picks', ascending=False)
+
+def run_backtest(start=None, end=None, refresh=True):
+    """
+    完整回测流程，返回 (逐条结果, 按类型汇总, 按板块汇总)
+    """
+    picks = trade_store.load_trades(start, end, columns=['日期', '时间', '板块', '类型', '代码', '买入价'])
+    prices = load_price_table(picks, refresh=refresh)
+    started = time.perf_counter()
+    result = compute_forward_returns(picks, prices)
+    by_type = summarize(result, '类型')
+    by_board = summarize(result, '板块')
+    print(f"🧮 回测 {len(result)} 条记录，计算用时 {(time.perf_counter() - started) * 1000:.0f}ms")
+    return result, by_type, by_board
+
+def _pct(value):
+    return "-" if pd.isna(value) else f"{value * 100:.2f}%"
+
+def _table(stats, key_name):
+    header = f"| {key_name} | 记录数 | " + " | ".join(f"{h}日收益 | {h}日胜率" for h in HORIZONS) + " | 平均回撤 | 最大回撤 |"
+    lines = [header, "|" + "---|" * (header.count('|') - 1)]
+    for key, row in stats.iterrows():
+        cells = " | ".join(f"{_pct(row[f'avg_{h}d'])} | {_pct(row[f'hit_{h}d'])}" for h in HORIZONS)
+        lines.append(f"| {key} | {int(row['picks'])} | {cells} | {_pct(row['avg_dd'])} | {_pct(row['max_dd'])} |")
+    return "\n".join(lines)
+
+def write_report(by_type, by_board, path=BACKTEST_REPORT, top_boards=20):
+    """写 markdown 回测报告"""
+    content = (f"# 选股回测报告\n\n生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n"
+               f"## 按策略类型\n\n{_table(by_type, '类型')}\n\n"
+               f"## 按板块 (记录数前 {top_boards})\n\n{_table(by_board.head(top_boards), '板块')}\n")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    print(f"📝 回测报告已写入 {path}")
+
+def summary_markdown(by_type):
+    """飞书卡片上的回测小结 (每种策略一行)"""
+    lines = ["**📊 历史回测**"]
+    for key, row in by_type.iterrows():
+        lines.append(f"{key}: {int(row['picks'])}笔 | 5日收益 {_pct(row['avg_5d'])} | "
+                     f"胜率 {_pct(row['hit_5d'])} | 最大回撤 {_pct(row['max_dd'])}")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="选股记录回测")
+    parser.add_argument("--start", help="起始日期 YYYY-MM-DD")
+    parser.add_argument("--end", help="结束日期 YYYY-MM-DD")
+    parser.add_argument("--offline", action="store_true", help="只用本地缓存的行情，不下载")
+    parser.add_argument("--output", default=BACKTEST_REPORT)
+    args = parser.parse_args()
+
+    _, by_type, by_board = run_backtest(args.start, args.end, refresh=not args.offline)
+    write_report(by_type, by_board, args.output)
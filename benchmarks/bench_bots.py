@@ -0,0 +1,252 @@
+import argparse
+import contextlib
+import functools
+import io
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.abspath(os.path.dirname(__file__)))
+BENCH_DIR = os.path.join(ROOT, "benchmarks")
+sys.path.insert(0, ROOT)
+
+import circuit
+import feishu
+import http_client
+import registry
+
+# 离线全流程基准：不联网，跑每个 bot 完整的 抓取 -> 渲染 -> 推送 -> 落盘
+#   python benchmarks/bench_bots.py                       全部 bot，各跑 3 次
+#   python benchmarks/bench_bots.py news x -r 5           只跑 news / x
+#   python benchmarks/bench_bots.py --latency-ms 80 --jitter-ms 40 --fail-rate 0.05
+#   python benchmarks/bench_bots.py --fail-host api.oioweb.cn   oioweb 全挂，走官方备用源
+#   python benchmarks/bench_bots.py --json out.json       保存结果
+#   python benchmarks/bench_bots.py --baseline out.json   和之前的结果比较，变慢超过容忍度返回 1
+# HTTP 请求经 http_client.set_url_rewriter 转到 stub_server.py (独立进程，不占本进程 CPU)；
+# akshare 替换成读 fixtures/akshare_*.csv 的桩对象；每次运行都在新的临时目录里，缓存/历史库互不影响。
+# 耗时取多次运行的中位数；内存峰值单独跑一次 (tracemalloc 会拖慢运行)；
+# 分阶段 CPU 用 thread_time 统计函数所在线程，阶段内部再开的线程池不计入
+
+# 各 bot 除了数据源和 send_to_feishu 之外，额外统计的阶段
+EXTRA_STAGES = {
+    "x": ["get_healthy_instances", "fetch_all_users"],
+    "prompt": ["drop_near_duplicates", "save_to_local"],
+    "stock": ["scan_boards", "select_stocks", "save_records"],
+}
+
+class StageTimer:
+    """给函数套一层计时：调用次数 / 墙钟时间 / 所在线程的 CPU 时间"""
+    def __init__(self):
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def wrap(self, name, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            wall, cpu = time.perf_counter(), time.thread_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+                with self.lock:
+                    calls, total_wall, total_cpu = self.stats.get(name, (0, 0.0, 0.0))
+                    self.stats[name] = (calls + 1, total_wall + wall, total_cpu + cpu)
+        return wrapper
+
+@contextlib.contextmanager
+def instrument(bot, module, timer):
+    """临时替换模块里的函数 (run() 运行时按全局名字查找，替换后就会走计时版本)"""
+    targets = []
+    for name, func in registry.SOURCES.items():
+        if name.startswith(bot + ".") and getattr(module, func.__name__, None) is func:
+            targets.append((module, func.__name__, name))
+    for attr in ["send_to_feishu"] + EXTRA_STAGES.get(bot, []):
+        if hasattr(module, attr):
+            targets.append((module, attr, attr))
+    targets.append((feishu, "post_payload", "feishu.post"))
+
+    originals = [(owner, attr, getattr(owner, attr)) for owner, attr, _ in targets]
+    try:
+        for owner, attr, stage in targets:
+            setattr(owner, attr, timer.wrap(stage, getattr(owner, attr)))
+        yield
+    finally:
+        for owner, attr, func in originals:
+            setattr(owner, attr, func)
+
+class FakeAkshare:
+    """akshare 的桩：从 fixtures 读行情表，延迟/失败注入和桩服务器一致"""
+    def __init__(self, opts):
+        import pandas as pd
+        self.opts = opts
+        self.rng = random.Random(opts.seed)
+        self.lock = threading.Lock()
+        fixtures = os.path.join(BENCH_DIR, "fixtures")
+        self.flow = pd.read_csv(os.path.join(fixtures, "akshare_fund_flow_concept.csv"))
+        cons = pd.read_csv(os.path.join(fixtures, "akshare_board_cons.csv"), dtype={"代码": str})
+        self.cons = {board: group.drop(columns="板块").reset_index(drop=True) for board, group in cons.groupby("板块")}
+
+    def _network(self):
+        with self.lock:
+            delay = self.opts.latency_ms + self.rng.uniform(0, self.opts.jitter_ms)
+            failed = "akshare" in self.opts.fail_host or self.rng.random() < self.opts.fail_rate
+        time.sleep(delay / 1000)
+        if failed:
+            raise ConnectionError("injected failure")
+
+    def stock_fund_flow_concept(self, symbol="即时"):
+        self._network()
+        return self.flow.copy()
+
+    def stock_board_concept_cons_em(self, symbol):
+        self._network()
+        return self.cons[symbol].copy()
+
+def start_stub(opts):
+    cmd = [sys.executable, os.path.join(BENCH_DIR, "stub_server.py"), "--latency-ms", str(opts.latency_ms),
+           "--jitter-ms", str(opts.jitter_ms), "--fail-rate", str(opts.fail_rate), "--seed", str(opts.seed)]
+    for host in opts.fail_host:
+        cmd += ["--fail-host", host]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    port = int(proc.stdout.readline().split()[1])
+    return proc, port
+
+def make_rewriter(port):
+    base = f"http://127.0.0.1:{port}/"
+    def rewrite(url):
+        parts = urlsplit(url)
+        return base + parts.netloc + parts.path + ("?" + parts.query if parts.query else "")
+    return rewrite
+
+def configure(opts):
+    """把各 bot 指向桩服务器，并去掉和性能无关的限速等待"""
+    feishu.FEISHU_WEBHOOK = "https://open.feishu.cn/open-apis/bot/v2/hook/bench"
+    feishu.FEISHU_SECRET = "bench"
+    feishu.FEISHU_RATE_PER_MIN = 60000
+    feishu.FEISHU_BURST = 1000
+    for name in registry.BOT_MODULES:
+        registry.load_bot(name)
+    x_bot = registry.load_bot("x")
+    x_bot.NITTER_RATE, x_bot.NITTER_BURST = 1000, 1000
+    news_bot = registry.load_bot("news")
+    news_bot.ARXIV_MAX_AGE_HOURS = 10 ** 6  # 样本里的论文日期是固定的
+    stock_bot = registry.load_bot("stock")
+    fake_ak = FakeAkshare(opts)
+    stock_bot._ak = lambda: fake_ak
+
+def run_once(bot, module, memory=False):
+    """在新的临时目录里跑一遍 bot，返回 (墙钟秒, 进程 CPU 秒, 内存峰值字节, 阶段统计, 日志)"""
+    timer = StageTimer()
+    workdir = tempfile.mkdtemp(prefix=f"bench-{bot}-")
+    cwd = os.getcwd()
+    log = io.StringIO()
+    os.chdir(workdir)
+    # 熔断状态在内存里也有一份，清掉才能和临时目录一起从零开始
+    circuit._state = None
+    circuit._probing.clear()
+    peak = None
+    try:
+        with contextlib.redirect_stdout(log), instrument(bot, module, timer):
+            if memory:
+                tracemalloc.start()
+            wall, cpu = time.perf_counter(), time.process_time()
+            module.run()
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            if memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return wall, cpu, peak, timer.stats, log.getvalue()
+
+def bench_bot(bot, opts):
+    module = registry.load_bot(bot)
+    walls, cpus, stage_runs = [], [], []
+    for _ in range(opts.repeat):
+        wall, cpu, _, stages, log = run_once(bot, module)
+        walls.append(wall)
+        cpus.append(cpu)
+        stage_runs.append(stages)
+        if opts.verbose:
+            print(log)
+    peak = None if opts.no_memory else run_once(bot, module, memory=True)[2]
+
+    stages = {}
+    for name in stage_runs[-1]:
+        runs = [s[name] for s in stage_runs if name in s]
+        stages[name] = {
+            "calls": runs[-1][0],
+            "wall": statistics.median(r[1] for r in runs),
+            "cpu": statistics.median(r[2] for r in runs),
+        }
+    return {"wall": statistics.median(walls), "cpu": statistics.median(cpus), "peak": peak, "stages": stages}
+
+def print_result(bot, result):
+    peak = f"{result['peak'] / 1024:.0f}KB" if result["peak"] is not None else "-"
+    print(f"⏱️ {bot:<8} 墙钟 {result['wall'] * 1000:8.0f}ms   CPU {result['cpu'] * 1000:8.0f}ms   内存峰值 {peak}")
+    for name, stage in sorted(result["stages"].items(), key=lambda item: -item[1]["wall"]):
+        print(f"     {name:<26} x{stage['calls']:<4} 墙钟 {stage['wall'] * 1000:8.1f}ms   CPU {stage['cpu'] * 1000:7.1f}ms")
+
+def compare(results, baseline, tolerance):
+    """和基线比较墙钟 / CPU，返回变慢的条目"""
+    regressions = []
+    for bot, result in results.items():
+        base = baseline.get(bot)
+        if not base:
+            continue
+        for key in ("wall", "cpu"):
+            if base[key] > 0 and result[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{bot}.{key}: {base[key] * 1000:.0f}ms -> {result[key] * 1000:.0f}ms")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="离线全流程基准 (桩服务器回放 fixtures)")
+    parser.add_argument("bots", nargs="*", help=f"要跑的 bot (默认全部): {', '.join(registry.BOT_MODULES)}")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="每个 bot 跑几次 (取中位数)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="每个响应的固定延迟")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="额外随机延迟 0~N ms")
+    parser.add_argument("--fail-rate", type=float, default=0, help="随机失败比例")
+    parser.add_argument("--fail-host", action="append", default=[], help="全部失败的 host (akshare 表示行情接口)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-memory", action="store_true", help="不单独测内存峰值")
+    parser.add_argument("--json", help="结果写入 JSON 文件")
+    parser.add_argument("--baseline", help="对比的基线 JSON (之前 --json 的输出)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="比基线慢多少算回退")
+    parser.add_argument("-v", "--verbose", action="store_true", help="打印 bot 自己的日志")
+    opts = parser.parse_args()
+
+    stub, port = start_stub(opts)
+    http_client.set_url_rewriter(make_rewriter(port))
+    try:
+        configure(opts)
+        results = {}
+        for bot in opts.bots or list(registry.BOT_MODULES):
+            results[bot] = bench_bot(bot, opts)
+            print_result(bot, results[bot])
+    finally:
+        http_client.set_url_rewriter(None)
+        http_client.close_all()
+        stub.terminate()
+        stub.wait()
+
+    if opts.json:
+        with open(opts.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=1)
+        print(f"💾 结果已写入 {opts.json}")
+    if opts.baseline:
+        with open(opts.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), opts.tolerance)
+        if regressions:
+            print(f"⚠️ 比基线慢超过 {opts.tolerance:.0%}:\n   " + "\n   ".join(regressions))
+            sys.exit(1)
+        print("✅ 没有超过容忍度的回退")
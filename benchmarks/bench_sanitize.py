@@ -0,0 +1,64 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import prompt_history
+import sanitize
+
+# HTML 摘要清洗基准：旧的逐处正则/replace 写法 vs sanitize.html_to_text
+#   python benchmarks/bench_sanitize.py            用 prompts_history.jsonl 里存的描述
+#   python benchmarks/bench_sanitize.py -n 20      每种写法跑 20 轮
+# 除了逐条清洗存量描述，还把相邻的描述拼成 ~4KB 的长摘要 (接近完整的 Reddit 帖子)，
+# 这种输入下截断能提前结束扫描，差距更明显
+
+def regex_clean(text, limit):
+    """旧写法 (x_bot)：每次现编译正则，整段处理完再截断；注释、实体都不处理"""
+    content = text.replace('<br>', '\n')
+    content = re.sub(r'<.*?>', '', content)
+    if len(content) > limit:
+        content = content[:limit] + "..."
+    return content
+
+def sanitize_clean(text, limit):
+    return sanitize.html_to_text(text, limit=limit)
+
+def load_docs():
+    path = os.path.join(ROOT, prompt_history.HISTORY_FILE)
+    with open(path, encoding="utf-8") as f:
+        descs = [json.loads(line).get("desc", "") for line in f if line.strip()]
+    long_docs = []
+    for i in range(0, len(descs), 30):
+        long_docs.append("".join(f"<p>{d}</p>\n" for d in descs[i:i + 30]))
+    return descs, long_docs
+
+def bench(func, docs, limit, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for doc in docs:
+            func(doc, limit)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+LEFTOVER_RE = re.compile(r'<!--|-->|&[a-zA-Z]+;|&#\d+;|<[a-zA-Z/]')
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTML 摘要清洗基准")
+    parser.add_argument("-n", type=int, default=10, help="每种写法跑几轮 (取最快一轮)")
+    parser.add_argument("--limit", type=int, default=150, help="截断长度")
+    args = parser.parse_args()
+
+    descs, long_docs = load_docs()
+    for name, docs in (("存量描述", descs), ("拼接长摘要", long_docs)):
+        avg_len = sum(map(len, docs)) / max(len(docs), 1)
+        print(f"📄 {name}: {len(docs)} 条，平均 {avg_len:.0f} 字符")
+        for label, func in (("regex", regex_clean), ("sanitize", sanitize_clean)):
+            elapsed = bench(func, docs, args.limit, args.n)
+            leftover = sum(1 for doc in docs if LEFTOVER_RE.search(func(doc, args.limit)))
+            print(f"   {label:<10}{elapsed * 1e6 / len(docs):>8.1f}us/条   残留标签/注释/实体 {leftover} 条")
@@ -0,0 +1,77 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import trend_bot
+
+# 微博热搜解析基准：对比旧的整页 BeautifulSoup 解析和 trend_bot.parse_weibo_hot 的增量 lxml 解析
+#   python benchmarks/bench_weibo_parse.py                   默认使用 fixtures/weibo_summary.html
+#   python benchmarks/bench_weibo_parse.py page.html -n 50   用自己保存的页面
+# fixtures 里的页面是按 s.weibo.com/top/summary 结构合成的 (内容随机)，想测真实数据可以自己另存一份
+# 内存用 tracemalloc 峰值衡量：旧实现的 BeautifulSoup 树全是 Python 对象，都会计入；
+# lxml 由 libxml2 在 C 层分配的内存不在统计范围内 (增量解析时这部分也只覆盖榜单区域)
+
+FIXTURE = os.path.join(ROOT, "benchmarks", "fixtures", "weibo_summary.html")
+
+def parse_soup(html, top_n=trend_bot.WEIBO_TOP_N):
+    """旧实现：整页建 BeautifulSoup 树再 select"""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'lxml')
+    items = soup.select('td.td-02 > a')
+    rows = []
+    for item in items[1:top_n + 1]:
+        hot_val = item.find_next_sibling('span')
+        rows.append((item.get_text().strip(), item.get('href'), hot_val.get_text().strip() if hot_val else ""))
+    return rows
+
+PATHS = {
+    "soup": parse_soup,
+    "fast": trend_bot.parse_weibo_hot,
+}
+
+def bench_time(func, html, runs):
+    func(html)  # 预热 (导入、缓存)
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(html)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2], samples[0]
+
+def bench_tracemalloc(func, html):
+    tracemalloc.start()
+    func(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="微博热搜解析基准")
+    parser.add_argument("page", nargs="?", default=FIXTURE, help="保存下来的热搜页面")
+    parser.add_argument("-n", type=int, default=30, help="每种解析方式的运行次数")
+    args = parser.parse_args()
+
+    with open(args.page, encoding="utf-8") as f:
+        html = f.read()
+    print(f"📄 {args.page} ({len(html.encode('utf-8')) / 1024:.0f}KB)，各运行 {args.n} 次")
+
+    results = {name: func(html) for name, func in PATHS.items()}
+    if results["soup"] != results["fast"]:
+        print("❌ 两种解析结果不一致")
+        for a, b in zip(results["soup"], results["fast"]):
+            if a != b:
+                print(f"   soup: {a}\n   fast: {b}")
+        sys.exit(1)
+    print(f"✅ 两种解析结果一致 ({len(results['fast'])} 条)")
+
+    print(f"{'解析方式':<8}{'中位耗时':>12}{'最快':>12}{'内存峰值':>14}")
+    for name, func in PATHS.items():
+        median, best = bench_time(func, html, args.n)
+        peak = bench_tracemalloc(func, html)
+        print(f"{name:<8}{median * 1000:>10.2f}ms{best * 1000:>10.2f}ms{peak / 1024:>12.0f}KB")
@@ -0,0 +1,251 @@
+import csv
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+# 生成离线基准用的响应样本 (benchmarks/fixtures/)：
+#   python benchmarks/make_fixtures.py
+# 这里的数据是按各接口真实的返回结构合成的 (内容随机、固定种子)，
+# 想用真实录制的响应替换时，保持文件名和结构不变即可。
+# weibo_summary.html 是解析基准单独维护的页面样本，这里不生成
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+WORDS = ["agent", "reasoning", "diffusion", "retrieval", "benchmark", "compiler", "rust", "vector", "database",
+         "browser", "terminal", "inference", "quantization", "robotics", "speech", "editor", "workflow", "graph"]
+CN_WORDS = ["新能源", "高考", "台风", "演唱会", "航天", "电影", "人工智能", "芯片", "地铁", "暴雨",
+            "奥运", "大模型", "春运", "股市", "新剧", "考研", "旅游", "外卖", "发布会", "机器人"]
+
+def phrase(rng, n=4):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+def cn_phrase(rng, n=2):
+    return "".join(rng.choice(CN_WORDS) for _ in range(n))
+
+def write(name, data):
+    path = os.path.join(FIXTURE_DIR, name)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if isinstance(data, str):
+            f.write(data)
+        else:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+    print(f"📝 {path} ({os.path.getsize(path) / 1024:.0f}KB)")
+
+def github_search(rng):
+    items = []
+    for i in range(10):
+        name = f"{rng.choice(WORDS)}-{rng.choice(WORDS)}"
+        owner = f"dev{rng.randint(1, 9999)}"
+        items.append({
+            "id": 800000000 + i, "name": name, "full_name": f"{owner}/{name}",
+            "owner": {"login": owner, "id": rng.randint(1, 10 ** 8), "type": "User"},
+            "html_url": f"https://github.com/{owner}/{name}",
+            "description": f"A {phrase(rng, 6)} toolkit",
+            "stargazers_count": rng.randint(200, 9000), "forks_count": rng.randint(5, 500),
+            "language": rng.choice(["Python", "Rust", "TypeScript", "Go", None]),
+            "created_at": "2026-10-12T08:00:00Z", "topics": [rng.choice(WORDS) for _ in range(3)],
+        })
+    return {"total_count": 15234, "incomplete_results": False, "items": items}
+
+def hacker_news(rng):
+    ids = [41000000 + i for i in range(500)]
+    items = {}
+    for item_id in ids[:30]:
+        items[str(item_id)] = {
+            "by": f"user{rng.randint(1, 5000)}", "descendants": rng.randint(0, 400), "id": item_id,
+            "kids": [rng.randint(41000000, 42000000) for _ in range(rng.randint(0, 20))],
+            "score": rng.randint(50, 1500), "time": 1760000000 + item_id % 10000,
+            "title": phrase(rng, 7).capitalize(), "type": "story",
+            "url": f"https://example.com/{rng.choice(WORDS)}/{item_id}",
+        }
+    return ids, items
+
+def arxiv_entries(rng, count=320):
+    """ArXiv Atom：stub_server 按 start / max_results 切片后拼成完整的 feed"""
+    now = datetime(2026, 10, 17, 18, 0, tzinfo=timezone.utc)
+    entries = []
+    for i in range(count):
+        published = (now - timedelta(minutes=7 * i)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        paper_id = f"2610.{20000 - i:05d}"
+        authors = "".join(f"\n    <author>\n      <name>Author {rng.randint(1, 9999)}</name>\n    </author>"
+                          for _ in range(rng.randint(1, 6)))
+        cat = rng.choice(["cs.CL", "cs.LG", "cs.AI"])
+        summary = " ".join(phrase(rng, 10).capitalize() + "." for _ in range(5))
+        entries.append(f"""  <entry>
+    <id>http://arxiv.org/abs/{paper_id}v1</id>
+    <updated>{published}</updated>
+    <published>{published}</published>
+    <title>{phrase(rng, 8).title()}</title>
+    <summary>  {summary}
+</summary>{authors}
+    <link href="http://arxiv.org/abs/{paper_id}v1" rel="alternate" type="text/html"/>
+    <link title="pdf" href="http://arxiv.org/pdf/{paper_id}v1" rel="related" type="application/pdf"/>
+    <arxiv:primary_category xmlns:arxiv="http://arxiv.org/schemas/atom" term="{cat}" scheme="http://arxiv.org/schemas/atom"/>
+    <category term="{cat}" scheme="http://arxiv.org/schemas/atom"/>
+  </entry>
+""")
+    return "".join(entries)
+
+def product_hunt(rng):
+    entries = []
+    for i in range(50):
+        name = f"{rng.choice(WORDS).title()}{rng.choice(WORDS).title()}"
+        entries.append(f"""  <entry>
+    <id>tag:www.producthunt.com,2005:Post/{900000 + i}</id>
+    <published>2026-10-17T0{i % 10}:00:00-07:00</published>
+    <updated>2026-10-17T0{i % 10}:30:00-07:00</updated>
+    <link rel="alternate" type="text/html" href="https://www.producthunt.com/products/{name.lower()}"/>
+    <title>{name}</title>
+    <content type="html">&lt;p&gt;
+          {phrase(rng, 8).capitalize()}
+        &lt;/p&gt;
+&lt;p&gt;
+  &lt;a href="https://www.producthunt.com/posts/{name.lower()}"&gt;Discussion&lt;/a&gt;
+  |
+  &lt;a href="https://www.producthunt.com/r/p/{900000 + i}"&gt;Link&lt;/a&gt;
+&lt;/p&gt;
+</content>
+    <author>
+      <name>maker{i}</name>
+    </author>
+  </entry>
+""")
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n<feed xml:lang="en-US" xmlns="http://www.w3.org/2005/Atom">\n'
+            '  <id>tag:www.producthunt.com,2005:/feed</id>\n  <title>Product Hunt</title>\n'
+            '  <updated>2026-10-17T09:30:00-07:00</updated>\n' + "".join(entries) + "</feed>\n")
+
+def baike_history(rng):
+    """百度百科历史上的今天：stub_server 按请求的月份把 DD 拼成 MMDD"""
+    days = {}
+    for day in range(1, 32):
+        events = []
+        for year in sorted(rng.sample(range(1800, 2024), 12)):
+            title = f"<a target=\"_blank\" href=\"https://baike.baidu.com/item/{cn_phrase(rng)}\">{cn_phrase(rng, 3)}</a>&nbsp;{cn_phrase(rng)}"
+            events.append({"year": str(year), "title": title, "festival": "", "link": "https://baike.baidu.com/item/x",
+                           "type": rng.choice(["event", "birth", "death"]), "desc": cn_phrase(rng, 8),
+                           "cover": False, "recommend": False})
+        days[f"{day:02d}"] = events
+    return days
+
+def oioweb(rng):
+    result = [{"index": i + 1, "title": cn_phrase(rng, 3), "href": f"https://www.example.cn/hot/{i}",
+               "hot": f"{rng.randint(10, 999)}万"} for i in range(50)]
+    return {"code": 200, "result": result, "msg": "success"}
+
+def bilibili(rng):
+    items = [{"aid": 1000000 + i, "bvid": f"BV1x{i:06d}", "title": cn_phrase(rng, 4),
+              "short_link_v2": f"https://b23.tv/BV1x{i:06d}", "pic": "https://i0.hdslb.com/x.jpg",
+              "owner": {"mid": rng.randint(1, 10 ** 8), "name": cn_phrase(rng)},
+              "stat": {"view": rng.randint(10 ** 5, 10 ** 7), "danmaku": rng.randint(100, 10 ** 5),
+                       "like": rng.randint(10 ** 3, 10 ** 6)}} for i in range(100)]
+    return {"code": 0, "message": "0", "ttl": 1, "data": {"note": "", "list": items}}
+
+def weibo_hotsearch(rng):
+    realtime = []
+    for i in range(50):
+        word = cn_phrase(rng, 3)
+        realtime.append({"word": word, "word_scheme": f"#{word}#", "num": rng.randint(10 ** 5, 10 ** 7),
+                         "rank": i, "label_name": rng.choice(["", "热", "新"]), "realpos": i + 1})
+    return {"ok": 1, "data": {"realtime": realtime, "hotgovs": []}}
+
+def reddit(rng):
+    entries = []
+    for i in range(25):
+        post_id = f"1q{i:05d}"
+        body = "".join(f"&lt;p&gt;{phrase(rng, 12)}&lt;/p&gt; " for _ in range(rng.randint(3, 10)))
+        entries.append(f"""<entry>
+  <author><name>/u/prompter{i}</name><uri>https://www.reddit.com/user/prompter{i}</uri></author>
+  <category term="ChatGPTPromptGenius" label="r/ChatGPTPromptGenius"/>
+  <content type="html">&lt;!-- SC_OFF --&gt;&lt;div class=&quot;md&quot;&gt;{body}&lt;/div&gt;&lt;!-- SC_ON --&gt;</content>
+  <id>t3_{post_id}</id>
+  <link href="https://www.reddit.com/r/ChatGPTPromptGenius/comments/{post_id}/post_{i}/"/>
+  <updated>2026-10-17T0{i % 10}:00:00+00:00</updated>
+  <published>2026-10-17T0{i % 10}:00:00+00:00</published>
+  <title>{phrase(rng, 6).capitalize()}</title>
+</entry>
+""")
+    return ('<?xml version="1.0" encoding="UTF-8"?><feed xmlns="http://www.w3.org/2005/Atom" '
+            'xmlns:media="http://search.yahoo.com/mrss/"><category term="ChatGPTPromptGenius" label="r/ChatGPTPromptGenius"/>'
+            '<updated>2026-10-17T10:00:00+00:00</updated><id>/r/ChatGPTPromptGenius/top.rss?t=day</id>'
+            '<title>top scoring links : ChatGPTPromptGenius</title>\n' + "".join(entries) + "</feed>\n")
+
+def civitai(rng):
+    items = []
+    for i in range(10):
+        image_id = 116000000 + rng.randint(0, 10 ** 6)
+        items.append({"id": image_id, "url": f"https://image.civitai.com/x/{image_id}.jpeg", "width": 832,
+                      "height": 1216, "nsfw": False, "createdAt": "2026-10-17T03:00:00.000Z",
+                      "stats": {"likeCount": rng.randint(100, 5000), "heartCount": rng.randint(10, 900)},
+                      "meta": {"prompt": f"masterpiece, <lora:style_{i}:0.8> {phrase(rng, 15)}",
+                               "negativePrompt": "lowres, bad anatomy", "steps": 30, "sampler": "DPM++ 2M",
+                               "cfgScale": 7, "seed": rng.randint(0, 2 ** 32)},
+                      "username": f"artist{i}"})
+    return {"items": items, "metadata": {"nextCursor": None}}
+
+def nitter(rng):
+    """Nitter RSS 模板：{user} 由 stub_server 替换"""
+    now = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+    items = []
+    for i in range(20):
+        status = 1840000000000000000 - i * 1000003
+        body = f"{phrase(rng, 14)}<br><a href=\"https://t.co/x{i}\">https://t.co/x{i}</a>"
+        items.append(f"""    <item>
+      <title>{phrase(rng, 8)}</title>
+      <dc:creator>@{{user}}</dc:creator>
+      <description><![CDATA[<p>{body}</p>]]></description>
+      <pubDate>{format_datetime(now - timedelta(hours=i))}</pubDate>
+      <guid>https://nitter.net/{{user}}/status/{status}#m</guid>
+      <link>https://nitter.net/{{user}}/status/{status}#m</link>
+    </item>
+""")
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n<rss xmlns:atom="http://www.w3.org/2005/Atom" '
+            'xmlns:dc="http://purl.org/dc/elements/1.1/" version="2.0">\n  <channel>\n'
+            '    <title>{user} / X</title>\n    <link>https://nitter.net/{user}</link>\n' + "".join(items)
+            + "  </channel>\n</rss>\n")
+
+def akshare_frames(rng):
+    """概念板块资金流 + 各板块成分股 (stub 的 akshare 按板块名过滤)"""
+    boards = [f"{cn_phrase(rng)}概念" for _ in range(40)]
+    flow = [["序号", "行业", "行业指数", "行业-涨跌幅", "流入资金", "流出资金", "主力净流入-净额", "公司家数", "领涨股"]]
+    cons = [["板块", "序号", "代码", "名称", "最新价", "涨跌幅", "涨跌额", "成交量", "成交额", "振幅", "换手率"]]
+    for i, board in enumerate(boards):
+        flow.append([i + 1, board, round(rng.uniform(800, 3000), 2), round(rng.uniform(-3, 6), 2),
+                     round(rng.uniform(10, 300), 2), round(rng.uniform(10, 300), 2),
+                     round(rng.uniform(-50, 80) * 1e8, 0), rng.randint(20, 150), cn_phrase(rng)])
+        for j in range(rng.randint(30, 120)):
+            price = round(rng.uniform(3, 200), 2)
+            cons.append([board, j + 1, f"{rng.choice(['00', '30', '60'])}{rng.randint(0, 9999):04d}", cn_phrase(rng),
+                         price, round(rng.uniform(-10, 10), 2), round(price * 0.01, 2), rng.randint(10 ** 4, 10 ** 7),
+                         round(rng.uniform(1e7, 5e9), 0), round(rng.uniform(0, 12), 2), round(rng.uniform(0, 30), 2)])
+    return flow, cons
+
+def write_csv(name, rows):
+    path = os.path.join(FIXTURE_DIR, name)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        csv.writer(f).writerows(rows)
+    print(f"📝 {path} ({os.path.getsize(path) / 1024:.0f}KB)")
+
+if __name__ == "__main__":
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    rng = random.Random(20261017)
+    write("github_search.json", github_search(rng))
+    ids, items = hacker_news(rng)
+    write("hn_topstories.json", ids)
+    write("hn_items.json", items)
+    write("coingecko_price.json", {"bitcoin": {"usd": 112345.0, "usd_24h_change": 1.234},
+                                   "ethereum": {"usd": 4123.5, "usd_24h_change": -0.876}})
+    write("arxiv_entries.xml", arxiv_entries(rng))
+    write("producthunt_feed.xml", product_hunt(rng))
+    write("baike_history.json", baike_history(rng))
+    write("oioweb_hotlist.json", oioweb(rng))
+    write("bilibili_ranking.json", bilibili(rng))
+    write("weibo_hotsearch.json", weibo_hotsearch(rng))
+    write("reddit_top.xml", reddit(rng))
+    write("civitai_images.json", civitai(rng))
+    write("nitter_user.xml", nitter(rng))
+    write("feishu_reply.json", {"StatusCode": 0, "StatusMessage": "success", "code": 0, "data": {}, "msg": "success"})
+    flow, cons = akshare_frames(rng)
+    write_csv("akshare_fund_flow_concept.csv", flow)
+    write_csv("akshare_board_cons.csv", cons)
@@ -0,0 +1,170 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# 离线基准用的桩服务器：用 fixtures/ 里的样本回放各个接口的响应
+# 请求路径格式是 /<原始 host>/<原始 path>?<原始 query>
+# (http_client.set_url_rewriter 把 https://api.github.com/search/... 改写成 http://127.0.0.1:端口/api.github.com/search/...)
+#   python benchmarks/stub_server.py --port 8765 --latency-ms 80 --fail-rate 0.05 --fail-host api.oioweb.cn
+# 启动后第一行输出 "PORT <端口>"，方便父进程读取
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+_cache = {}
+
+def fixture(name):
+    if name not in _cache:
+        with open(os.path.join(FIXTURE_DIR, name), "rb") as f:
+            _cache[name] = f.read()
+    return _cache[name]
+
+def static(name, content_type="application/json"):
+    def handler(req):
+        return 200, content_type, fixture(name)
+    return handler
+
+def hn_item(req):
+    items = json.loads(fixture("hn_items.json"))
+    item_id = req.path.rsplit("/", 1)[-1].split(".")[0]
+    return 200, "application/json", json.dumps(items.get(item_id)).encode()
+
+def arxiv_page(req):
+    entries = fixture("arxiv_entries.xml").decode("utf-8").split("  <entry>")[1:]
+    start = int(req.query.get("start", ["0"])[0])
+    size = int(req.query.get("max_results", ["10"])[0])
+    body = ('<?xml version="1.0" encoding="UTF-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom">\n'
+            '  <title type="html">ArXiv Query</title>\n'
+            + "".join("  <entry>" + e for e in entries[start:start + size]) + "</feed>\n")
+    return 200, "application/atom+xml", body.encode("utf-8")
+
+def baike_month(req):
+    month = req.path.rsplit("/", 1)[-1].split(".")[0]
+    days = json.loads(fixture("baike_history.json"))
+    data = {month: {month + day: events for day, events in days.items()}}
+    return 200, "application/json", json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+def nitter(req):
+    parts = [p for p in req.path.split("/") if p]
+    if len(parts) == 2 and parts[1] == "rss":
+        body = fixture("nitter_user.xml").decode("utf-8").replace("{user}", parts[0])
+        return 200, "application/rss+xml", body.encode("utf-8")
+    return 200, "text/html", b"<html><body>nitter</body></html>"  # 探测首页
+
+# (host, path 前缀, 处理函数)；host 以 * 结尾表示前缀匹配
+ROUTES = [
+    ("api.github.com", "/search/repositories", static("github_search.json")),
+    ("hacker-news.firebaseio.com", "/v0/topstories.json", static("hn_topstories.json")),
+    ("hacker-news.firebaseio.com", "/v0/item/", hn_item),
+    ("api.coingecko.com", "/api/v3/simple/price", static("coingecko_price.json")),
+    ("export.arxiv.org", "/api/query", arxiv_page),
+    ("s.weibo.com", "/top/summary", static("weibo_summary.html", "text/html; charset=utf-8")),
+    ("www.producthunt.com", "/feed", static("producthunt_feed.xml", "application/atom+xml")),
+    ("baike.baidu.com", "/cms/home/eventsOnHistory/", baike_month),
+    ("api.oioweb.cn", "/api/common/HotList", static("oioweb_hotlist.json")),
+    ("api.bilibili.com", "/x/web-interface/ranking/v2", static("bilibili_ranking.json")),
+    ("weibo.com", "/ajax/side/hotSearch", static("weibo_hotsearch.json")),
+    ("www.reddit.com", "/r/", static("reddit_top.xml", "application/atom+xml")),
+    ("civitai.com", "/api/v1/images", static("civitai_images.json")),
+    ("open.feishu.cn", "/open-apis/bot/", static("feishu_reply.json")),
+    ("nitter.*", "/", nitter),
+]
+
+class StubRequest:
+    def __init__(self, host, path, query):
+        self.host, self.path, self.query = host, path, query
+
+def route(host, path):
+    for route_host, prefix, handler in ROUTES:
+        host_ok = host.startswith(route_host[:-1]) if route_host.endswith("*") else host == route_host
+        if host_ok and path.startswith(prefix):
+            return handler
+    return None
+
+def make_handler(opts):
+    rng = random.Random(opts.seed)
+    rng_lock = threading.Lock()
+    fail_hosts = set(opts.fail_host)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # 响应头和响应体分两次写，不关 Nagle 的话每个请求会被延迟确认卡 40ms
+        disable_nagle_algorithm = True
+
+        def _reply(self, status, content_type, body, headers=None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            if self.command != "HEAD":
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # 客户端提前关闭 (比如 ArXiv 读够了就停)
+
+        def _handle(self):
+            parts = urlsplit(self.path)
+            host, _, path = parts.path.lstrip("/").partition("/")
+            path = "/" + path
+            with rng_lock:
+                delay = opts.latency_ms + rng.uniform(0, opts.jitter_ms)
+                failed = host in fail_hosts or rng.random() < opts.fail_rate
+            time.sleep(delay / 1000)
+            if self.command == "POST":
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if failed:
+                return self._reply(503, "text/plain", b"injected failure")
+
+            handler = route(host, path)
+            if handler is None:
+                return self._reply(404, "text/plain", f"no fixture for {host}{path}".encode())
+            status, content_type, body = handler(StubRequest(host, path, parse_qs(parts.query)))
+            # 静态样本带 ETag，feed_cache 的条件请求能拿到 304
+            etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+            if status == 200 and self.headers.get("If-None-Match") == etag:
+                return self._reply(304, content_type, b"", {"ETag": etag})
+            self._reply(status, content_type, body, {"ETag": etag})
+
+        do_GET = do_POST = do_HEAD = _handle
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # 客户端读够就关连接 (ArXiv 流式读取提前停止) 是正常情况，不打印堆栈
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="离线基准桩服务器")
+    parser.add_argument("--port", type=int, default=0, help="监听端口 (0 表示随机)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="每个响应固定增加的延迟")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="在固定延迟上再随机增加 0~N ms")
+    parser.add_argument("--fail-rate", type=float, default=0, help="随机返回 503 的比例")
+    parser.add_argument("--fail-host", action="append", default=[], help="这个 host 的请求全部返回 503 (可重复)")
+    parser.add_argument("--seed", type=int, default=1, help="延迟/失败注入的随机种子")
+    return parser
+
+if __name__ == "__main__":
+    opts = build_parser().parse_args()
+    server = StubServer(("127.0.0.1", opts.port), make_handler(opts))
+    print(f"PORT {server.server_port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    sys.exit(0)
@@ -0,0 +1,182 @@
+import argparse
+import os
+import threading
+import time
+
+import local_store
+import metrics
+import orchestrator
+
+# 按上游来源的熔断器 + 自适应超时，状态跨运行保存在 .cache/circuits.json：
+#   连续失败 CIRCUIT_FAILURE_THRESHOLD 次后熔断，冷却期内直接跳过 (调用方走备用源)，
+#   冷却时间随连续失败次数翻倍；冷却结束放行一次探测 (半开)，成功就恢复，失败继续熔断。
+#   成功请求的延迟保留最近 CIRCUIT_HISTORY 条，超时取 p95 * CIRCUIT_TIMEOUT_FACTOR，
+#   不超过调用方给的默认超时 (样本不够或半开探测时用默认超时)；
+#   在 orchestrator.run_sources 里运行时还要装得进剩余时间，装不下就别发了。
+#   熔断保护的请求都不在 http_client 里重试 (retries=0)：失败一次交给熔断器计数，
+#   重试只会把一个挂掉的上游拖成好几倍超时。
+#   python circuit.py                 查看各来源状态
+#   python circuit.py --reset oioweb  手动恢复某个来源
+
+# ================= 配置 =================
+CIRCUIT_FILE = "circuits.json"
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "2"))
+CIRCUIT_COOLDOWN = float(os.getenv("CIRCUIT_COOLDOWN", str(30 * 60)))       # 第一次熔断冷却 30 分钟
+CIRCUIT_MAX_COOLDOWN = float(os.getenv("CIRCUIT_MAX_COOLDOWN", str(24 * 60 * 60)))  # 最长冷却 1 天
+CIRCUIT_HISTORY = 50
+CIRCUIT_MIN_SAMPLES = 5
+CIRCUIT_TIMEOUT_FACTOR = float(os.getenv("CIRCUIT_TIMEOUT_FACTOR", "3"))
+CIRCUIT_MIN_TIMEOUT = float(os.getenv("CIRCUIT_MIN_TIMEOUT", "2"))
+# =======================================
+
+_state = None
+_probing = set()
+_lock = threading.Lock()
+
+def _load():
+    """第一次用到时读取状态文件 (需持有 _lock)"""
+    global _state
+    if _state is None:
+        _state = local_store.load_json(CIRCUIT_FILE, {})
+    return _state
+
+def _entry(key):
+    """取某个来源的状态 (需持有 _lock): {streak, last_fail, last_error, ok, fail, latencies}"""
+    return _load().setdefault(key, {"streak": 0, "last_fail": 0, "last_error": None, "ok": 0, "fail": 0, "latencies": []})
+
+def _cooldown(streak):
+    return min(CIRCUIT_MAX_COOLDOWN, CIRCUIT_COOLDOWN * 2 ** (streak - CIRCUIT_FAILURE_THRESHOLD))
+
+def _status(entry, now=None):
+    if entry["streak"] < CIRCUIT_FAILURE_THRESHOLD:
+        return "closed"
+    if (now or time.time()) - entry["last_fail"] < _cooldown(entry["streak"]):
+        return "open"
+    return "half_open"
+
+def state(key):
+    """closed (正常) / open (熔断中) / half_open (冷却结束，等待探测)"""
+    with _lock:
+        return _status(_entry(key))
+
+def allow(key):
+    """
+    这次能不能请求该来源：熔断中返回 False；
+    半开状态只放行一个探测请求，探测出结果前同一进程里的其他请求继续跳过
+    """
+    with _lock:
+        status = _status(_entry(key))
+        if status == "closed":
+            return True
+        if status == "half_open" and key not in _probing:
+            _probing.add(key)
+            return True
+    metrics.emit("circuit", source=key, status="open")
+    return False
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+def _learned_timeout(entry):
+    """按历史延迟学到的超时 (需持有 _lock)，样本不够返回 None"""
+    if len(entry["latencies"]) < CIRCUIT_MIN_SAMPLES:
+        return None
+    return max(CIRCUIT_MIN_TIMEOUT, _percentile(entry["latencies"], 95) * CIRCUIT_TIMEOUT_FACTOR)
+
+def learned_timeout(key):
+    """这个来源自己学到的超时 (秒)，样本不够时返回 None (请求时用调用方的默认超时)"""
+    with _lock:
+        return _learned_timeout(_entry(key))
+
+def timeout(key, default, retries=0, reserve=0):
+    """
+    按历史延迟算超时：p95 * CIRCUIT_TIMEOUT_FACTOR，下限 CIRCUIT_MIN_TIMEOUT，不超过 default
+    default 可以是秒数或 (连接超时, 读取超时)，元组的每一项分别封顶
+    在 run_sources 里运行时，timeout * (retries + 1) 还要装进剩余时间 (先扣掉 reserve，
+    留给失败后的备用源)，装不下 CIRCUIT_MIN_TIMEOUT 就返回 None，调用方直接跳过
+    要在 allow() 之前调用，跳过时不会占掉半开状态的探测名额
+    """
+    with _lock:
+        entry = _entry(key)
+        limit = _learned_timeout(entry) if _status(entry) == "closed" else None
+    left = orchestrator.time_left()
+    if left is not None:
+        budget = (left - reserve) / (retries + 1)
+        if budget < CIRCUIT_MIN_TIMEOUT:
+            metrics.emit("circuit", source=key, status="no_time")
+            return None
+        limit = budget if limit is None else min(limit, budget)
+    if limit is None:
+        return default
+    if isinstance(default, tuple):
+        return tuple(min(d, limit) for d in default)
+    return min(default, limit)
+
+def latency(key):
+    """历史延迟中位数 (秒)，没有记录返回 None，用于给同类节点排序"""
+    with _lock:
+        latencies = _entry(key)["latencies"]
+        return _percentile(latencies, 50) if latencies else None
+
+def record_success(key, elapsed=None):
+    """记录一次成功 (elapsed 是这次请求的耗时，秒)，熔断恢复"""
+    with _lock:
+        entry = _entry(key)
+        if entry["streak"] >= CIRCUIT_FAILURE_THRESHOLD:
+            print(f"🔌 {key} 已恢复")
+        entry["streak"] = 0
+        entry["ok"] += 1
+        if elapsed is not None:
+            entry["latencies"] = (entry["latencies"] + [round(elapsed, 3)])[-CIRCUIT_HISTORY:]
+        _probing.discard(key)
+        local_store.save_json(CIRCUIT_FILE, _state)
+
+def record_failure(key, error=None):
+    """记录一次失败，连续失败达到阈值就熔断"""
+    with _lock:
+        entry = _entry(key)
+        entry["fail"] += 1
+        entry["last_error"] = str(error)[:200] if error is not None else None
+        _probing.discard(key)
+        if _status(entry) == "open":
+            # 熔断前就已经发出的并发请求陆续失败，不重复延长冷却
+            local_store.save_json(CIRCUIT_FILE, _state)
+            return
+        entry["streak"] += 1
+        entry["last_fail"] = time.time()
+        if entry["streak"] >= CIRCUIT_FAILURE_THRESHOLD:
+            print(f"🔌 {key} 连续失败 {entry['streak']} 次，熔断 {_cooldown(entry['streak']) / 60:.0f} 分钟")
+        local_store.save_json(CIRCUIT_FILE, _state)
+
+def reset(key):
+    with _lock:
+        _load().pop(key, None)
+        _probing.discard(key)
+        local_store.save_json(CIRCUIT_FILE, _state)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="查看 / 重置熔断器")
+    parser.add_argument("--reset", action="append", default=[], help="恢复某个来源 (可重复)")
+    args = parser.parse_args()
+
+    for key in args.reset:
+        reset(key)
+        print(f"🔌 {key} 已重置")
+    with _lock:
+        entries = dict(_load())
+    if not entries:
+        print("📭 还没有熔断记录")
+    now = time.time()
+    for key, entry in sorted(entries.items()):
+        status = _status(entry, now)
+        median = f"{latency(key) * 1000:.0f}ms" if entry["latencies"] else "-"
+        learned = learned_timeout(key)
+        # 样本不够时请求用调用方自己的默认超时
+        learned = f"{learned:.1f}s" if learned is not None else f"默认 (样本 {len(entry['latencies'])}/{CIRCUIT_MIN_SAMPLES})"
+        line = f"{key:<32}{status:<10} 成功 {entry['ok']:<5} 失败 {entry['fail']:<5} 中位延迟 {median:>7}  超时 {learned}"
+        if status != "closed":
+            line += f"  连续失败 {entry['streak']} 次: {entry['last_error']}"
+        if status == "open":
+            line += f" (还剩 {(entry['last_fail'] + _cooldown(entry['streak']) - now) / 60:.0f} 分钟)"
+        print(line)
@@ -0,0 +1,64 @@
+import hashlib
+import os
+import pickle
+import time
+from urllib.parse import urlsplit
+
+import http_client
+import local_store
+import metrics
+
+# RSS/Atom 条件请求缓存：
+# 磁盘上保存 ETag / Last-Modified 以及解析好的 feed，
+# 服务端返回 304 时直接复用上次的解析结果，既不下载也不重新解析
+
+FEED_CACHE_DIR = "feeds"
+
+def _cache_file(url):
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    return local_store.cache_path(FEED_CACHE_DIR, f"{key}.pickle")
+
+def _load(path):
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, pickle.PickleError, EOFError, AttributeError):
+        return None
+
+def fetch_feed(url, headers=None, timeout=15, limiter=None, retries=http_client.MAX_RETRIES):
+    """
+    下载并解析 feed (带条件请求)，limiter / retries 传给 http_client，每次尝试各取一个令牌
+    返回 feedparser 的解析结果，用法和 feedparser.parse(...) 一样
+    """
+    path = _cache_file(url)
+    cached = _load(path)
+
+    req_headers = dict(headers or {})
+    if cached:
+        if cached.get("etag"):
+            req_headers["If-None-Match"] = cached["etag"]
+        if cached.get("modified"):
+            req_headers["If-Modified-Since"] = cached["modified"]
+
+    resp = http_client.get(url, headers=req_headers, timeout=timeout, limiter=limiter, retries=retries)
+    host = urlsplit(url).netloc
+    if resp.status_code == 304 and cached:
+        print(f"♻️ Feed 未变化，复用缓存: {url}")
+        metrics.emit("feed", host=host, cache="hit", items=len(cached["parsed"].entries))
+        return cached["parsed"]
+    resp.raise_for_status()
+
+    import feedparser  # 只有真正要解析时才导入 (304 命中缓存时不需要解析)
+    start = time.monotonic()
+    parsed = feedparser.parse(resp.content)
+    metrics.emit("feed", host=host, cache="miss", items=len(parsed.entries), bytes=len(resp.content),
+                 latency_ms=round((time.monotonic() - start) * 1000, 1))
+    etag = resp.headers.get("ETag")
+    modified = resp.headers.get("Last-Modified")
+    # 服务端不给校验值就没必要缓存 (下次也没法发条件请求)
+    if etag or modified:
+        entry = {"etag": etag, "modified": modified, "parsed": parsed}
+        local_store.atomic_write(path, pickle.dumps(entry, pickle.HIGHEST_PROTOCOL), mode="wb")
+    elif os.path.exists(path):
+        os.remove(path)
+    return parsed
@@ -0,0 +1,241 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+
+import requests
+
+import http_client
+import metrics
+import outbox
+import rate_limit
+
+# ================= 配置 =================
+FEISHU_WEBHOOK = os.getenv("FEISHU_WEBHOOK")
+FEISHU_SECRET = os.getenv("FEISHU_SECRET")
+# 自定义机器人请求体上限是 20KB，留一点余量
+FEISHU_MAX_BYTES = int(os.getenv("FEISHU_MAX_BYTES", str(19 * 1024)))
+FEISHU_MAX_RETRIES = int(os.getenv("FEISHU_MAX_RETRIES", "3"))
+# 飞书返回的限流错误码 (HTTP 200 但 code 非 0)
+FEISHU_RETRY_CODES = {9499, 11232}
+# Webhook / 签名配置错误 (token 无效、签名不匹配、IP 不在白名单)：每张卡片都会失败，不是卡片本身的问题
+FEISHU_CONFIG_CODES = {19001, 19021, 19022}
+# 发件箱的发送限速 (自定义机器人限制 100 次/分钟、5 次/秒，多个 bot 同一分钟触发时容易撞上)
+FEISHU_RATE_PER_MIN = float(os.getenv("FEISHU_RATE_PER_MIN", "20"))
+FEISHU_BURST = int(os.getenv("FEISHU_BURST", "3"))
+# =======================================
+
+SECTION_SEPARATOR = "\n\n----------------\n\n"
+# 预留给 " (12/12)" 这种分页后缀的长度
+_PAGE_SUFFIX_RESERVE = 16
+
+def gen_sign(timestamp, secret):
+    """
+    飞书签名生成算法 (HMAC-SHA256)
+    """
+    # 拼接时间戳和密钥
+    string_to_sign = '{}\n{}'.format(timestamp, secret)
+    # 使用 HMAC-SHA256 进行加密
+    hmac_code = hmac.new(string_to_sign.encode("utf-8"), digestmod=hashlib.sha256).digest()
+    # 对结果进行 Base64 编码
+    sign = base64.b64encode(hmac_code).decode('utf-8')
+    return sign
+
+def build_payload(title, content, template="blue", note=None):
+    """构建带签名的 markdown 消息卡片"""
+    timestamp = str(int(time.time()))
+    elements = [{"tag": "markdown", "content": content}]
+    if note:
+        elements.append({"tag": "note", "elements": [{"tag": "plain_text", "content": note}]})
+    payload = {
+        "msg_type": "interactive",
+        "card": {
+            "header": {
+                "title": {"tag": "plain_text", "content": title},
+                "template": template
+            },
+            "elements": elements
+        }
+    }
+    # 配置了密钥才需要签名
+    if FEISHU_SECRET:
+        payload["timestamp"] = timestamp
+        payload["sign"] = gen_sign(timestamp, FEISHU_SECRET)
+    return payload
+
+def encode_payload(payload):
+    """序列化成实际发送的字节 (不转义中文，同样的内容体积只有 ensure_ascii 的一半左右)"""
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _json_size(text):
+    """text 放进 JSON 字符串后占用的字节数 (不含两边引号)"""
+    return len(json.dumps(text, ensure_ascii=False).encode("utf-8")) - 2
+
+def _split_oversized(section, budget):
+    """单个板块本身就超限时按行切开，单行还超限就截断"""
+    chunks, current, size = [], [], 0
+    for line in section.split("\n"):
+        line_size = _json_size(line + "\n")
+        if line_size > budget:
+            while _json_size(line + "…") > budget:
+                line = line[:len(line) * budget // line_size - 1]
+                line_size = _json_size(line + "\n")
+            line += "…"
+            line_size = _json_size(line + "\n")
+        if current and size + line_size > budget:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += line_size
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+def pack_sections(title, sections, template="blue", note=None, separator=SECTION_SEPARATOR, max_bytes=None):
+    """
+    把板块按顺序装进尽量少的卡片，每张卡片序列化后不超过 max_bytes
+    只在板块之间切分；单个板块本身超限时才在行边界切开
+    返回每张卡片的 markdown 内容列表
+    """
+    max_bytes = max_bytes or FEISHU_MAX_BYTES
+    base = len(encode_payload(build_payload(title, "", template, note))) + _PAGE_SUFFIX_RESERVE
+    budget = max_bytes - base
+    sep_size = _json_size(separator)
+
+    cards, current, size = [], [], 0
+    for section in sections:
+        for piece in ([section] if _json_size(section) <= budget else _split_oversized(section, budget)):
+            piece_size = _json_size(piece)
+            extra = piece_size + (sep_size if current else 0)
+            if current and size + extra > budget:
+                cards.append(separator.join(current))
+                current, size, extra = [], 0, piece_size
+            current.append(piece)
+            size += extra
+    if current:
+        cards.append(separator.join(current))
+    return cards
+
+def post_payload(payload, limiter=None):
+    """
+    发送一张卡片，被限流 / 服务端出错时退避重试 (limiter 每次尝试前各取一个令牌)
+    返回 (是否成功, 飞书返回结果或错误信息, 是否被飞书明确拒收)
+    只有 HTTP 4xx (429 除外) 或飞书返回不可重试的错误码才算拒收，这种卡片重发也没用；
+    网络错误、超时、限流、服务端出错、Webhook 配置错误都不算，卡片留在发件箱下次补发
+    """
+    body = encode_payload(payload)
+    headers = {"Content-Type": "application/json; charset=utf-8"}
+    result = None
+    for attempt in range(FEISHU_MAX_RETRIES + 1):
+        retry_after = None
+        if limiter:
+            limiter.acquire()
+        try:
+            # 重试逻辑在这里统一处理，http_client 这一层不再重试
+            resp = http_client.post(FEISHU_WEBHOOK, data=body, headers=headers, retries=0)
+            retry_after = resp.headers.get("Retry-After")
+            try:
+                result = resp.json()
+            except ValueError:
+                result = {"code": -1, "msg": f"HTTP {resp.status_code}"}
+            if resp.status_code == 200 and result.get("code") == 0:
+                return True, result, False
+            retryable = resp.status_code == 429 or resp.status_code >= 500 or result.get("code") in FEISHU_RETRY_CODES
+            if not retryable:
+                return False, result, not _is_config_error(result)
+        except requests.ConnectTimeout as e:
+            # 连接都没建立，请求肯定没发出去，可以放心重试
+            result = str(e)
+        except requests.RequestException as e:
+            # 请求可能已经送达，马上重试有重复推送的风险，留在发件箱下次再发
+            return False, str(e), False
+        if attempt >= FEISHU_MAX_RETRIES:
+            break
+        delay = http_client.backoff_delay(attempt, retry_after)
+        print(f"⏳ 飞书推送被限流/失败，{delay:.1f}s 后重试: {result}")
+        time.sleep(delay)
+    return False, result, False
+
+def _is_config_error(result):
+    return isinstance(result, dict) and result.get("code") in FEISHU_CONFIG_CODES
+
+def drain_outbox():
+    """
+    按限速依次发送发件箱里的卡片 (包括之前运行没发出去的)
+    网络错误 / 被限流 / 服务端出错 / Webhook 配置错误时停下，剩下的保持顺序留到下次运行补发；
+    只有被飞书明确拒收的卡片 (请求体不合法等) 直接丢弃这张，继续发后面的
+    返回本次送达的卡片 id 集合
+    """
+    if not FEISHU_WEBHOOK:
+        print("❌ 未配置飞书 Webhook")
+        return set()
+    bucket = rate_limit.get_bucket("feishu", FEISHU_RATE_PER_MIN / 60, FEISHU_BURST)
+    delivered = set()
+    conn = outbox.connect()
+    try:
+        for title in outbox.expire(conn):
+            print(f"🗑️ 卡片过期或重试次数用完，已丢弃: {title}")
+        for card_id, title, content, template, note, attempts, _, _ in outbox.pending(conn):
+            payload = build_payload(title, content, template, note)
+            size = len(encode_payload(payload))
+            replay = f" [补发第 {attempts} 次]" if attempts else ""
+            t0 = time.monotonic()
+            ok, result, rejected = post_payload(payload, bucket)
+            latency = (time.monotonic() - t0) * 1000
+            metrics.emit("send", source="feishu", title=title, status="ok" if ok else "fail",
+                         bytes=size, latency_ms=round(latency, 1), retries=attempts)
+            if ok:
+                outbox.mark_sent(conn, card_id)
+                delivered.add(card_id)
+                print(f"✅ 推送成功！{title}{replay} ({size}B, {latency:.0f}ms)")
+            elif rejected:
+                outbox.mark_dead(conn, card_id)
+                print(f"🗑️ 卡片被飞书拒收，已丢弃: {title}{replay} ({size}B) {result}")
+            else:
+                outbox.mark_failed(conn, card_id, result)
+                # 加上错误检查，万一签名不对能看到报错
+                print(f"❌ 推送失败: {title}{replay} ({size}B, {latency:.0f}ms) {result}")
+                break
+        depth, age = outbox.stats(conn)
+        if depth:
+            print(outbox.format_stats(depth, age))
+    finally:
+        conn.close()
+    return delivered
+
+def send_sections(title, sections, template="blue", note=None, separator=SECTION_SEPARATOR):
+    """
+    推送一组板块：内容超过飞书大小限制时在板块边界拆成多张卡片
+    卡片先写入发件箱再发送，没发出去的下次运行会补发
+    卡片进了发件箱 (迟早会送达) 返回 True，调用方据此决定能不能提交增量游标；
+    没配置 Webhook / 没有内容时什么都不入队，返回 False
+    """
+    if not FEISHU_WEBHOOK:
+        print("❌ 未配置飞书 Webhook")
+        return False
+    sections = [s for s in sections if s]
+    if not sections:
+        return False
+
+    with metrics.stage("render", source="feishu", title=title) as record:
+        cards = pack_sections(title, sections, template, note, separator)
+        record["items"] = len(cards)
+        record["bytes"] = sum(_json_size(card) for card in cards)
+    titles = [title if len(cards) == 1 else f"{title} ({i + 1}/{len(cards)})" for i in range(len(cards))]
+    ids = outbox.enqueue([(card_title, content, template, note) for card_title, content in zip(titles, cards)])
+
+    started = time.monotonic()
+    delivered = drain_outbox()
+    if len(cards) > 1:
+        print(f"📨 共 {len(cards)} 张卡片，总用时 {(time.monotonic() - started) * 1000:.0f}ms")
+    if not all(card_id in delivered for card_id in ids):
+        print("📮 本次卡片没有全部送达，留在发件箱下次补发")
+    return True
+
+def send_card(title, content, template="blue", note=None):
+    """
+    推送一张卡片到飞书 (超限时同样会自动拆分)，进了发件箱返回 True
+    """
+    return send_sections(title, [content], template, note)
@@ -0,0 +1,135 @@
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+# ================= 配置 =================
+# 默认超时: (连接超时, 读取超时)，单位秒。调用方可以用 timeout= 覆盖
+DEFAULT_TIMEOUT = (5, 15)
+# 429 / 5xx 的最大重试次数
+MAX_RETRIES = 2
+# 退避时间: min(BACKOFF_MAX, BACKOFF_BASE * 2^n) 内随机取值 (full jitter)
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# 每个 host 的连接池大小 (要 >= 各 bot 的最大并发数)
+POOL_SIZE = 32
+
+# 统一的请求头，不再每个 bot 各自复制一份
+BROWSER_UA = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+RSS_BOT_UA = "Mozilla/5.0 (Compatible; RSS Bot)"
+DEFAULT_HEADERS = {"User-Agent": BROWSER_UA}
+# =======================================
+
+_sessions = {}
+_lock = threading.Lock()
+_url_rewriter = None
+
+def set_url_rewriter(func):
+    """
+    安装 URL 改写钩子 func(url) -> url，传 None 取消
+    离线基准测试用它把所有请求转到本地桩服务器 (benchmarks/stub_server.py)
+    """
+    global _url_rewriter
+    _url_rewriter = func
+
+def get_session(url):
+    """
+    按 host 复用 Session：同一个 host 整个运行期间只建一次 TCP+TLS 连接
+    """
+    host = urlsplit(url).netloc
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(DEFAULT_HEADERS)
+            _sessions[host] = session
+    return session
+
+def backoff_delay(attempt, retry_after=None):
+    """计算第 attempt 次重试前的等待时间，优先遵守服务端的 Retry-After"""
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+def request(method, url, retries=MAX_RETRIES, retry_read_timeout=False, limiter=None, **kwargs):
+    """
+    发送请求 (带默认超时 + 429/5xx 抖动退避重试)
+    非幂等的 POST 只在连接没建立 / 被限流时重试，避免重复推送
+    读取超时默认不重试：每次重试都要再等满一个读取超时，慢接口会把总耗时放大 retries+1 倍，
+    确实需要时传 retry_read_timeout=True
+    limiter: 限速器 (有 acquire() 的令牌桶)，每次尝试 (含重试) 前各取一个令牌
+    每次调用 (含重试) 记一条 http 指标：host / 状态码 / 字节数 / 延迟 / 重试次数
+    """
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    host = urlsplit(url).netloc  # 改写之前的真实 host
+    start = time.monotonic()
+    if _url_rewriter:
+        url = _url_rewriter(url)
+    session = get_session(url)
+    idempotent = method.upper() in ("GET", "HEAD", "OPTIONS")
+
+    for attempt in range(retries + 1):
+        if limiter:
+            limiter.acquire()
+        try:
+            resp = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if isinstance(e, requests.ConnectTimeout):
+                retryable = True
+            elif isinstance(e, requests.ReadTimeout):
+                retryable = idempotent and retry_read_timeout
+            else:
+                retryable = idempotent
+            if attempt >= retries or not retryable:
+                _record(method, host, start, attempt, error=type(e).__name__)
+                raise
+            time.sleep(backoff_delay(attempt))
+            continue
+
+        retryable = idempotent or resp.status_code == 429
+        if resp.status_code in RETRY_STATUS and retryable and attempt < retries:
+            time.sleep(backoff_delay(attempt, resp.headers.get("Retry-After")))
+            continue
+        _record(method, host, start, attempt, resp, stream=kwargs.get("stream"))
+        return resp
+
+def _record(method, host, start, retries, resp=None, error=None, stream=False):
+    size = None
+    if resp is not None:
+        # 流式响应还没读 body，只能看 Content-Length
+        size = resp.headers.get("Content-Length") if stream else len(resp.content)
+    metrics.emit(
+        "http",
+        method=method.upper(),
+        host=host,
+        status=resp.status_code if resp is not None else "error",
+        error=error,
+        bytes=int(size) if size is not None else None,
+        latency_ms=round((time.monotonic() - start) * 1000, 1),
+        retries=retries,
+    )
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+def close_all():
+    """关闭所有连接池 (进程退出前可选调用)"""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,79 @@
+import argparse
+import subprocess
+import sys
+
+import registry
+
+# 冷启动导入耗时检查：
+# 在新的解释器里用 `python -X importtime -c "import 模块"` 导入各个 bot 模块，
+# 汇总每个顶层包的累计耗时，超过预算时返回非 0，方便在 CI 里发现导入耗时回退
+#   python import_budget.py                     检查全部 bot
+#   python import_budget.py news stock -n 5     只看 news / stock，每个列出前 5 个包
+#   python import_budget.py --budget-ms 300     任意 bot 导入超过 300ms 就失败
+
+# ================= 配置 =================
+DEFAULT_BUDGET_MS = 500
+# =======================================
+
+def measure(module):
+    """
+    在子进程里导入 module，返回 (总耗时us, [(包名, 累计us, 自身us), ...])
+    列表是 module 直接导入的依赖，按顶层包合并 (更深的嵌套导入已经算在累计耗时里)
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else f"import {module} failed")
+
+    # -X importtime 的输出是后序的：子模块先打印，父模块最后打印；
+    # 名字前面 1 个空格是顶层导入，每深一层多 2 个空格
+    children = []
+    total = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        if depth == 1:
+            children.append((name, int(cumulative_us), int(self_us)))
+        elif depth == 0:
+            if name == module:
+                total = int(cumulative_us)
+                break
+            children = []  # 解释器启动时的导入，不算
+
+    packages = {}
+    for name, cumulative_us, self_us in children:
+        top = name.split(".")[0]
+        prev = packages.get(top, (0, 0))
+        packages[top] = (prev[0] + cumulative_us, prev[1] + self_us)
+    ranked = sorted(((name, cum, own) for name, (cum, own) in packages.items()), key=lambda x: x[1], reverse=True)
+    return total, ranked
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="检查各 bot 的冷启动导入耗时")
+    parser.add_argument("bots", nargs="*", help=f"要检查的 bot (默认全部): {', '.join(registry.BOT_MODULES)}")
+    parser.add_argument("-n", type=int, default=8, help="每个 bot 列出耗时最多的前 N 个包")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="单个 bot 的导入耗时预算")
+    args = parser.parse_args()
+
+    over_budget = []
+    for bot in args.bots or list(registry.BOT_MODULES):
+        module = registry.BOT_MODULES[bot]
+        try:
+            total, ranked = measure(module)
+        except RuntimeError as e:
+            print(f"❌ {bot} ({module}) 导入失败: {e}")
+            over_budget.append(bot)
+            continue
+        flag = "✅" if total / 1000 <= args.budget_ms else "⚠️"
+        print(f"{flag} {bot} ({module}.py) 导入 {total / 1000:.1f}ms")
+        for name, cum, own in ranked[:args.n]:
+            print(f"    {name:<20} 累计 {cum / 1000:8.1f}ms   自身 {own / 1000:6.1f}ms")
+        if total / 1000 > args.budget_ms:
+            over_budget.append(bot)
+
+    if over_budget:
+        print(f"\n⚠️ 超出 {args.budget_ms:g}ms 预算: {', '.join(over_budget)}")
+        sys.exit(1)
@@ -0,0 +1,104 @@
+import json
+import os
+import tempfile
+import threading
+
+# ================= 配置 =================
+# 跨运行保存的本地状态/缓存目录 (GitHub Actions 里用 actions/cache 持久化)
+CACHE_DIR = os.getenv("BOT_CACHE_DIR", ".cache")
+# 各数据源的增量抓取游标 (高水位 / 已见 ID)
+CURSOR_FILE = "cursors.json"
+# =======================================
+
+def cache_path(*parts):
+    """返回缓存目录下的路径，并确保父目录存在"""
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+def atomic_write(path, data, mode="w", **kwargs):
+    """先写临时文件再 rename，进程中途被杀也不会留下半个文件"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, mode, **kwargs) as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def load_json(name, default=None):
+    """读取缓存目录下的 JSON 文件，不存在或损坏时返回 default"""
+    path = os.path.join(CACHE_DIR, name)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+def save_json(name, data):
+    """原子写入缓存目录下的 JSON 文件"""
+    atomic_write(cache_path(name), json.dumps(data, ensure_ascii=False), encoding='utf-8')
+
+# ---- 增量抓取游标 ----
+# 抓取函数用 stage_cursor 暂存新游标，卡片进了发件箱后由 run() 调用 commit_cursors 落盘，
+# 没能入队 (没配置 Webhook 等) 时调用 discard_cursors 作废；
+# 单独调试某个数据源 (runner.py --source) 时不提交，游标不会前移。
+# 暂存时记下是哪个数据源 (metrics.current_source) 暂存的：超过截止时间被丢弃的来源，
+# 内容没进卡片，orchestrator 调用 discard_cursors 把它的游标作废，之后再暂存也忽略
+
+_pending_cursors = {}   # 游标名 -> (值, 暂存它的数据源)
+_discarded_owners = set()
+_cursor_lock = threading.Lock()
+
+def load_cursor(source, default=None):
+    """读取某个数据源已提交的游标"""
+    return load_json(CURSOR_FILE, {}).get(source, default)
+
+def stage_cursor(source, value):
+    """暂存新游标 (线程安全，并发抓取的各个用户可以各自暂存)"""
+    import metrics  # metrics 依赖本模块，用到时再导入避免循环导入
+    owner = metrics.current_source()
+    with _cursor_lock:
+        if owner in _discarded_owners:
+            print(f"⏰ {owner} 已超时被丢弃，不暂存游标 {source}")
+            return
+        _pending_cursors[source] = (value, owner)
+
+def discard_cursors(owners=None):
+    """
+    作废这些数据源暂存的游标，它们之后 (迟到的线程) 再暂存也忽略
+    owners 为 None 时作废全部暂存的游标 (卡片没能入队，内容下次要重新抓)
+    """
+    with _cursor_lock:
+        if owners is None:
+            _pending_cursors.clear()
+            return
+        _discarded_owners.update(owners)
+        for source, (_, owner) in list(_pending_cursors.items()):
+            if owner in _discarded_owners:
+                del _pending_cursors[source]
+
+def accept_cursors(owners):
+    """这些数据源重新开始运行，恢复接收它们的游标"""
+    with _cursor_lock:
+        _discarded_owners.difference_update(owners)
+
+def commit_cursors():
+    """把暂存的游标写回 cursors.json"""
+    with _cursor_lock:
+        if not _pending_cursors:
+            return
+        cursors = load_json(CURSOR_FILE, {})
+        cursors.update((source, value) for source, (value, _) in _pending_cursors.items())
+        save_json(CURSOR_FILE, cursors)
+        _pending_cursors.clear()
+
+def remember_ids(seen, new_ids, cap):
+    """把 new_ids 加到已见 ID 列表末尾，只保留最近的 cap 个"""
+    new_ids = list(new_ids)
+    fresh = set(new_ids)
+    return ([i for i in seen if i not in fresh] + new_ids)[-cap:]
@@ -1,20 +1,14 @@
-import requests
-import json
+import http_client
+import feishu
+import registry
 import os
-import base64
-import hashlib
-import hmac
-import time
-from datetime import datetime
 
 # 配置部分 (实际运行时会从环境变量读取)
-# 飞书 Webhook 地址 //测试
-# 从环境变量获取，如果获取不到（比如本地运行），就使用后面的默认值或者 None
-FEISHU_WEBHOOK = os.getenv("FEISHU_WEBHOOK")
-FEISHU_SECRET = os.getenv("FEISHU_SECRET")
+# 飞书 Webhook / 密钥 由 feishu 模块统一从环境变量读取
 # DeepSeek API (如果你想让AI写点评)
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
 
+@registry.source("github.trending")
 def get_github_trending():
     """
     修正版：获取过去 7 天内创建且最火的项目
@@ -29,15 +23,14 @@ def get_github_trending():
     # 搜索条件：创建时间 > 7天前
     url = f"https://api.github.com/search/repositories?q=created:>{search_date}&sort=stars&order=desc&per_page={LIMIT}"
     
-    # GitHub API 要求必须带 User-Agent
+    # GitHub API 要求必须带 User-Agent (http_client 已统一带上)
     headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) Python/3.9",
         "Accept": "application/vnd.github.v3+json"
     }
 
     try:
         print(f"正在请求 GitHub API: {url}") # 方便调试
-        resp = requests.get(url, headers=headers, timeout=10)
+        resp = http_client.get(url, headers=headers, timeout=10)
         
         if resp.status_code == 200:
             data = resp.json()
@@ -85,46 +78,15 @@ def ai_summarize(project_desc):
         ]
     }
     try:
-        resp = requests.post(url, headers=headers, json=data)
+        resp = http_client.post(url, headers=headers, json=data, timeout=(5, 30))
         return resp.json()['choices'][0]['message']['content']
     except:
         return project_desc
 
-def gen_sign(timestamp, secret):
-    """
-    飞书签名生成算法
-    """
-    # 拼接时间戳和密钥
-    string_to_sign = '{}\n{}'.format(timestamp, secret)
-    # 使用 HMAC-SHA256 进行加密
-    hmac_code = hmac.new(
-        string_to_sign.encode("utf-8"), 
-        digestmod=hashlib.sha256
-    ).digest()
-    # 对结果进行 Base64 编码
-    sign = base64.b64encode(hmac_code).decode('utf-8')
-    return sign
-
-
 def send_to_feishu(content_list):
     """
     推送到飞书
     """
-    if not FEISHU_WEBHOOK:
-        print("未配置飞书 Webhook")
-        return
-
-    # 1. 获取当前时间戳（整数，单位秒）
-    timestamp = str(int(time.time()))
-    
-    # 2. 生成签名 (如果配置了密钥)
-    sign = None
-    if FEISHU_SECRET:
-        sign = gen_sign(timestamp, FEISHU_SECRET)
-
-    # 构建飞书富文本消息卡片
-    date_str = datetime.now().strftime("%Y-%m-%d")
-    
     elements = []
     for item in content_list:
         name = item.get('author') + " / " + item.get('name')
@@ -138,43 +100,15 @@ def send_to_feishu(content_list):
         
         elements.append(f"⭐ **{stars}** | {language}\n[{name}]({url})\n> {desc}\n")
 
-    card_content = "\n---\n".join(elements)
-    
-      # 3. 构建最终 payload
-    payload = {
-        "timestamp": timestamp, # 必填
-        "sign": sign,           # 必填
-        "msg_type": "interactive",
-        "card": {
-            # ... (这里面的内容跟之前一样) ...
-             "header": {
-                "title": {
-                    "tag": "plain_text",
-                    "content": f"📅 GitHub 每日精选"
-                },
-                "template": "blue"
-            },
-            "elements": [
-                {
-                    "tag": "markdown",
-                    "content": card_content # 这里引用你之前生成的变量
-                }
-            ]
-        }
-    }
-
-    # 发送请求
-    resp = requests.post(FEISHU_WEBHOOK, json=payload)
-    
-    # 加上错误检查，万一签名不对能看到报错
-    if resp.json().get("code") != 0:
-        print(f"发送失败: {resp.json()}")
-    else:
-        print("推送成功！")
+    # 签名、拆分超长卡片、发送和错误检查由公共的 feishu 模块负责
+    feishu.send_sections("📅 GitHub 每日精选", elements, template="blue", separator="\n---\n")
 
-if __name__ == "__main__":
+def run():
     projects = get_github_trending()
     if projects:
         send_to_feishu(projects)
     else:
-        print("今日无数据")
\ No newline at end of file
+        print("今日无数据")
+
+if __name__ == "__main__":
+    run()
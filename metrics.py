@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+import local_store
+
+# 结构化运行指标：每次抓取 / 解析 / 渲染 / 推送 / HTTP 请求各写一行 JSON 到 .cache/metrics.jsonl
+# (GitHub Actions 里随 .cache 一起持久化，跨运行累积)
+#   python metrics.py                    按数据源汇总 p50/p95 延迟和失败率
+#   python metrics.py --days 7 --by host 只看最近 7 天，按上游 host 汇总 HTTP 请求
+# 记录字段: ts, run, kind (stage/http/akshare/circuit/feed/send/deadline), source, host, status, bytes,
+#          latency_ms, retries, items, cache (hit/miss)
+# 抓取函数大多吞掉异常返回 None / [] / 占位文字，所以数据源的 fetch 状态还要看它期间的上游请求：
+# 上游请求全部失败、或者返回空且有请求失败，都记为 error (见 registry.source)
+
+# ================= 配置 =================
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+METRICS_FILE = "metrics.jsonl"
+# 超过这个大小就轮转成 metrics.jsonl.1 (只保留一个旧文件)
+METRICS_MAX_BYTES = int(os.getenv("METRICS_MAX_BYTES", str(5 * 1024 * 1024)))
+# =======================================
+
+RUN_ID = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+
+# 上游请求 (HTTP / akshare / 熔断跳过) 按数据源累计的 [成功, 失败] 次数
+UPSTREAM_KINDS = ("http", "akshare", "circuit")
+
+_local = threading.local()
+_write_lock = threading.Lock()
+_upstream = {}
+
+def current_source():
+    """当前线程正在执行的数据源 (http_client / feed_cache 记录时用它标注来源)"""
+    return getattr(_local, "source", None)
+
+def emit(kind, **fields):
+    """追加一条指标记录 (失败也不影响业务)"""
+    if not METRICS_ENABLED:
+        return
+    record = {"ts": round(time.time(), 3), "run": RUN_ID, "kind": kind}
+    if "source" not in fields:
+        record["source"] = current_source()
+    record.update((k, v) for k, v in fields.items() if v is not None)
+    if kind in UPSTREAM_KINDS and record.get("source"):
+        # 熔断器拒绝的请求也算这个来源的一次失败
+        failed = kind == "circuit" or is_failure(record)
+        with _write_lock:
+            _upstream.setdefault(record["source"], [0, 0])[failed] += 1
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    try:
+        with _write_lock:
+            path = local_store.cache_path(METRICS_FILE)
+            if os.path.exists(path) and os.path.getsize(path) > METRICS_MAX_BYTES:
+                os.replace(path, path + ".1")
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+    except OSError as e:
+        print(f"⚠️ 指标写入失败: {e}")
+
+def upstream_outcomes(source):
+    """这个数据源到目前为止的上游请求 (成功次数, 失败次数)"""
+    with _write_lock:
+        ok, failed = _upstream.get(source, (0, 0))
+    return ok, failed
+
+def mark_failed(error):
+    """
+    抓取函数吞掉异常、返回占位文字 ("xxx 获取失败") 时调用，
+    把当前线程正在记录的阶段标成 error，失败率里就能看到
+    """
+    record = getattr(_local, "record", None)
+    if record is not None:
+        record["status"] = "error"
+        record["error"] = str(error)[:200]
+
+def count_items(value):
+    """数据源返回值的条目数：列表算长度，非空字符串 (一个板块) 算 1"""
+    if isinstance(value, (list, tuple, dict)):
+        return len(value)
+    return 1 if value else 0
+
+@contextmanager
+def stage(name, source=None, **fields):
+    """
+    记录一个阶段的耗时和结果，with 块里可以往返回的 dict 里补充字段 (items / cache / status ...)
+    指定 source 时，块内 (同一线程) 的 HTTP 请求都标注为这个来源
+    """
+    previous = current_source()
+    previous_record = getattr(_local, "record", None)
+    if source is not None:
+        _local.source = source
+    record = dict(fields)
+    _local.record = record
+    start = time.monotonic()
+    try:
+        yield record
+        record.setdefault("status", "ok")
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = str(e)[:200]
+        raise
+    finally:
+        record["latency_ms"] = round((time.monotonic() - start) * 1000, 1)
+        emit("stage", stage=name, source=source or previous, **record)
+        _local.source = previous
+        _local.record = previous_record
+
+def bind(func):
+    """把当前线程的数据源带进线程池里的任务 (线程池的线程拿不到调用方的 threading.local)"""
+    source = current_source()
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        previous = current_source()
+        _local.source = source
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.source = previous
+    return wrapper
+
+# ---- 汇总报表 ----
+
+def load_records(days=None, path=None):
+    """读取指标文件 (含轮转出来的旧文件)，days 只保留最近几天"""
+    path = path or os.path.join(local_store.CACHE_DIR, METRICS_FILE)
+    cutoff = time.time() - days * 86400 if days else 0
+    records = []
+    for name in (path + ".1", path):
+        if not os.path.exists(name):
+            continue
+        with open(name, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # 进程被杀时可能留下半行
+                if record.get("ts", 0) >= cutoff:
+                    records.append(record)
+    return records
+
+def percentile(values, p):
+    """最近秩法的百分位数 (values 已排序)"""
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, int(round(p / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+def is_failure(record):
+    if record.get("status") in ("error", "fail", "late"):
+        return True
+    status = record.get("status")
+    return isinstance(status, int) and status >= 400
+
+def summarize(records, by="source"):
+    """按 (阶段或类型, source/host) 分组：次数、失败率、p50/p95 延迟、平均条目数、缓存命中率"""
+    groups = {}
+    for record in records:
+        # 阶段记录按阶段名分开 (fetch / render)，其他按记录类型
+        key = (record.get("stage") or record.get("kind"), record.get(by) or "-")
+        groups.setdefault(key, []).append(record)
+    rows = []
+    for (kind, name), items in groups.items():
+        latencies = sorted(r["latency_ms"] for r in items if r.get("latency_ms") is not None)
+        counted = [r["items"] for r in items if r.get("items") is not None]
+        cached = [r["cache"] for r in items if r.get("cache")]
+        rows.append({
+            "kind": kind,
+            "name": name,
+            "count": len(items),
+            "runs": len({r.get("run") for r in items}),
+            "failure_rate": sum(map(is_failure, items)) / len(items),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "items": sum(counted) / len(counted) if counted else None,
+            "cache_hit": cached.count("hit") / len(cached) if cached else None,
+        })
+    rows.sort(key=lambda r: (r["kind"], -(r["p95"] or 0)))
+    return rows
+
+def _fmt(value, pattern, empty="-"):
+    return pattern.format(value) if value is not None else empty
+
+def print_report(rows):
+    print(f"{'类型':<9}{'来源':<28}{'次数':>6}{'运行':>6}{'失败率':>8}{'p50':>10}{'p95':>10}{'条目':>7}{'缓存命中':>9}")
+    for r in rows:
+        print(f"{r['kind']:<9}{str(r['name'])[:27]:<28}{r['count']:>6}{r['runs']:>6}{r['failure_rate']:>8.0%}"
+              f"{_fmt(r['p50'], '{:.0f}ms'):>10}{_fmt(r['p95'], '{:.0f}ms'):>10}"
+              f"{_fmt(r['items'], '{:.1f}'):>7}{_fmt(r['cache_hit'], '{:.0%}'):>9}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="汇总运行指标")
+    parser.add_argument("--days", type=float, help="只看最近 N 天")
+    parser.add_argument("--by", choices=["source", "host"], default="source", help="分组字段")
+    parser.add_argument("--kind", action="append", help="只看某类记录 (stage/http/akshare/circuit/feed/send/deadline，可重复)")
+    parser.add_argument("--file", help=f"指标文件 (默认 {local_store.CACHE_DIR}/{METRICS_FILE})")
+    args = parser.parse_args()
+
+    records = load_records(args.days, args.file)
+    if args.kind:
+        records = [r for r in records if r.get("kind") in args.kind]
+    if not records:
+        print("📭 没有指标记录")
+    else:
+        print(f"📊 {len(records)} 条记录，{len({r.get('run') for r in records})} 次运行")
+        print_report(summarize(records, args.by))
@@ -1,22 +1,30 @@
-import requests
-import feedparser
-import time
+import http_client
+import feishu
+import registry
+import orchestrator
+import arxiv_stream
+import local_store
+import metrics
+import circuit
 import os
-import hmac
-import hashlib
-import base64
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # ================= 配置 =================
-FEISHU_WEBHOOK = os.getenv("FEISHU_WEBHOOK")
-FEISHU_SECRET = os.getenv("FEISHU_SECRET")
+# Hacker News 抓取条数 / 并发数 / 单条超时(秒)
+HN_TOP_N = int(os.getenv("HN_TOP_N", "5"))
+HN_MAX_WORKERS = int(os.getenv("HN_MAX_WORKERS", "16"))
+HN_ITEM_TIMEOUT = float(os.getenv("HN_ITEM_TIMEOUT", "3"))
+# ArXiv：每次最多扫描多少篇 / 只看最近多少小时 / 本地关键词过滤 (逗号分隔，留空不过滤) / 推送几篇
+ARXIV_QUERY = "cat:cs.CL OR cat:cs.LG OR cat:cs.AI"
+ARXIV_MAX_RESULTS = int(os.getenv("ARXIV_MAX_RESULTS", "300"))
+ARXIV_MAX_AGE_HOURS = float(os.getenv("ARXIV_MAX_AGE_HOURS", "72"))
+ARXIV_KEYWORDS = [k.strip().lower() for k in os.getenv("ARXIV_KEYWORDS", "").split(",") if k.strip()]
+ARXIV_SHOW_N = int(os.getenv("ARXIV_SHOW_N", "3"))
+ARXIV_SEEN_CAP = 2000
 # =======================================
 
-def gen_sign(timestamp, secret):
-    string_to_sign = '{}\n{}'.format(timestamp, secret)
-    hmac_code = hmac.new(string_to_sign.encode("utf-8"), digestmod=hashlib.sha256).digest()
-    sign = base64.b64encode(hmac_code).decode('utf-8')
-    return sign
-
+@registry.source("news.crypto")
 def get_crypto_price():
     """获取 BTC/ETH 简报"""
     url = "https://api.coingecko.com/api/v3/simple/price"
@@ -25,10 +33,20 @@ def get_crypto_price():
         "vs_currencies": "usd",
         "include_24hr_change": "true"
     }
+    # 连续失败 / 限流时熔断一段时间，不再每次运行都等超时
+    timeout = circuit.timeout("coingecko", 5)
+    if timeout is None:
+        print("⏭️ 剩余时间不够请求 Coingecko，跳过")
+        return None
+    if not circuit.allow("coingecko"):
+        print("⏭️ Coingecko 熔断中，跳过")
+        return None
+    start = time.monotonic()
     try:
         # Coingecko 免费版有时候会限流，加个超时处理。
-        resp = requests.get(url, params=params, timeout=5)
+        resp = http_client.get(url, params=params, timeout=timeout, retries=0)
         if resp.status_code != 200:
+            circuit.record_failure("coingecko", f"HTTP {resp.status_code}")
             return None
             
         data = resp.json()
@@ -36,6 +54,7 @@ def get_crypto_price():
         btc_change = data['bitcoin']['usd_24h_change']
         eth_price = data['ethereum']['usd']
         eth_change = data['ethereum']['usd_24h_change']
+        circuit.record_success("coingecko", time.monotonic() - start)
         
         btc_icon = "🔺" if btc_change > 0 else "🔻"
         eth_icon = "🔺" if eth_change > 0 else "🔻"
@@ -43,111 +62,131 @@ def get_crypto_price():
         return (f"🪙 **Crypto Market**\n"
                 f"**BTC**: ${btc_price:,.0f} ({btc_icon}{btc_change:.2f}%)\n"
                 f"**ETH**: ${eth_price:,.0f} ({eth_icon}{eth_change:.2f}%)")
-    except:
+    except Exception as e:
+        circuit.record_failure("coingecko", e)
         return None # 获取失败就不显示这一块了
 
-def get_hacker_news():
-    """获取 Hacker News Top 5"""
-    print("正在获取 Hacker News...")
+def fetch_hn_item(item_id):
+    """抓取单条 HN 条目，失败返回 None (不影响整个板块)"""
+    item_url = f"https://hacker-news.firebaseio.com/v0/item/{item_id}.json"
+    try:
+        resp = http_client.get(item_url, timeout=HN_ITEM_TIMEOUT, retries=1)
+        return resp.json()
+    except Exception as e:
+        print(f"HN item {item_id} Error: {e}")
+        return None
+
+@registry.source("news.hacker_news")
+def get_hacker_news(top_n=None):
+    """获取 Hacker News Top N (并发抓取条目，保持排名顺序)"""
+    top_n = top_n or HN_TOP_N
+    print(f"正在获取 Hacker News Top {top_n}...")
     try:
+        # http_client 按 host 复用 keep-alive 连接，N+1 次请求只握手一次
         top_url = "https://hacker-news.firebaseio.com/v0/topstories.json"
-        ids = requests.get(top_url, timeout=5).json()[:5]
-        
+        ids = http_client.get(top_url, timeout=5).json()[:top_n]
+
+        # 有界线程池并发抓取，map 按输入顺序返回结果，天然保持排名
+        workers = min(HN_MAX_WORKERS, http_client.POOL_SIZE, len(ids) or 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            items = list(pool.map(metrics.bind(fetch_hn_item), ids))
+
         stories = []
-        for i, item_id in enumerate(ids):
-            item_url = f"https://hacker-news.firebaseio.com/v0/item/{item_id}.json"
-            item = requests.get(item_url, timeout=3).json()
-            
+        for item_id, item in zip(ids, items):
+            if not item:
+                continue  # 单条失败就跳过
             title = item.get('title')
             url = item.get('url', f"https://news.ycombinator.com/item?id={item_id}")
             score = item.get('score', 0)
             
-            stories.append(f"**{i+1}. {title}**\n🔥 {score} pts | [Read]({url})")
-            
-        return "**🍊 Hacker News Top 5**\n" + "\n".join(stories)
+            stories.append(f"**{len(stories)+1}. {title}**\n🔥 {score} pts | [Read]({url})")
+
+        if not stories:
+            metrics.mark_failed("没有抓到任何条目")
+            return "Hacker News 获取失败"
+        return f"**🍊 Hacker News Top {top_n}**\n" + "\n".join(stories)
     except Exception as e:
         print(f"HN Error: {e}")
+        metrics.mark_failed(e)
         return "Hacker News 获取失败"
 
+@registry.source("news.arxiv")
 def get_arxiv_papers():
     """获取 ArXiv 最新 AI 论文 (CS.CL/LG/AI)"""
     print("正在获取 ArXiv...")
     try:
         # 查询策略：
         # cat:cs.CL (计算语言学/LLM) OR cat:cs.LG (机器学习) OR cat:cs.AI (人工智能)
-        # sortBy=submittedDate (按提交时间倒序)
-        query = "cat:cs.CL+OR+cat:cs.LG+OR+cat:cs.AI"
-        url = f"http://export.arxiv.org/api/query?search_query={query}&sortBy=submittedDate&sortOrder=descending&max_results=3"
-        
-        data = feedparser.parse(url)
+        # sortBy=submittedDate (按提交时间倒序)，流式读取，选够 ARXIV_SHOW_N 篇或读到太旧的就停。
+        # 只记住真正推送过的论文：被关键词滤掉的、名额满了没推的下次还要再看，
+        # 所以已推送的论文是跳过而不是停止 (比窗口更早的论文由 cutoff 挡住，不用记)
+        seen = local_store.load_cursor("news.arxiv", [])
+        seen_ids = set(seen)
+        entries = arxiv_stream.iter_recent(ARXIV_QUERY, ARXIV_MAX_RESULTS,
+                                           cutoff=arxiv_stream.cutoff_hours(ARXIV_MAX_AGE_HOURS))
         
         papers = []
-        for entry in data.entries:
-            title = entry.title.replace('\n', ' ')
-            link = entry.link
+        pushed_ids = []
+        scanned = 0
+        for entry in entries:
+            scanned += 1
+            if entry["id"] in seen_ids:
+                continue
+            # 本地关键词过滤
+            text = f"{entry['title']} {entry['summary']}".lower()
+            if ARXIV_KEYWORDS and not any(k in text for k in ARXIV_KEYWORDS):
+                continue
             
-            # 处理摘要：去掉换行符，截取前100个字符
-            summary = entry.summary.replace('\n', ' ')[:100] + "..."
+            # 处理摘要：截取前100个字符
+            summary = entry["summary"][:100] + "..."
             
             # 获取第一作者
-            author = entry.authors[0].name if entry.authors else "Unknown"
-            
-            papers.append(f"📄 **{title}**\n👤 {author} et al.\n> {summary}\n[PDF]({link})")
+            author = entry["authors"][0] if entry["authors"] else "Unknown"
             
+            papers.append(f"📄 **{entry['title']}**\n👤 {author} et al.\n> {summary}\n[PDF]({entry['pdf']})")
+            pushed_ids.append(entry["id"])
+            if len(papers) >= ARXIV_SHOW_N:
+                break
+        entries.close()  # 提前停下时关闭还没读完的页面
+        
+        # 推送完成后由 run() 提交；这个来源超时被丢弃时 orchestrator 会作废它
+        local_store.stage_cursor("news.arxiv", local_store.remember_ids(seen, reversed(pushed_ids), ARXIV_SEEN_CAP))
+        print(f"✅ ArXiv 扫描 {scanned} 篇论文，选出 {len(papers)} 篇")
+        if not papers:
+            return None
         return "**🎓 ArXiv AI Daily (Latest)**\n" + "\n\n".join(papers)
     except Exception as e:
         print(f"ArXiv Error: {e}")
+        metrics.mark_failed(e)
         return "ArXiv 获取失败"
 
 def send_to_feishu(content_list):
-    if not FEISHU_WEBHOOK: 
-        print("未配置 Webhook")
-        return
-    
-    timestamp = str(int(time.time()))
-    sign = gen_sign(timestamp, FEISHU_SECRET)
-    
+    """推送卡片，进了发件箱返回 True"""
     # 过滤掉 None (获取失败的模块)
     valid_contents = [c for c in content_list if c]
     
     if not valid_contents:
         print("所有模块都获取失败，取消推送")
-        return
+        return False
 
-    # 用分割线拼接
-    final_content = "\n\n----------------\n\n".join(valid_contents)
+    # 各板块用分割线拼接，超长时按板块拆成多张卡片
+    return feishu.send_sections("🌍 每日科技 & 金融全览", valid_contents, template="blue",
+                     note="Source: Coingecko | HackerNews | ArXiv")
+
+def run():
+    # 所有来源并发抓取，卡片里按这里的顺序排列 (不想要的板块可以注释掉)
+    sources = [
+        ("Crypto", get_crypto_price),    # 1. Crypto
+        ("HackerNews", get_hacker_news), # 2. Hacker News
+        ("ArXiv", get_arxiv_papers),     # 3. ArXiv Papers
+    ]
+    msgs, late = orchestrator.run_sources(sources)
     
-    payload = {
-        "timestamp": timestamp,
-        "sign": sign,
-        "msg_type": "interactive",
-        "card": {
-            "header": {
-                "title": {"tag": "plain_text", "content": "🌍 每日科技 & 金融全览"},
-                "template": "blue"
-            },
-            "elements": [
-                {"tag": "markdown", "content": final_content},
-                {
-                    "tag": "note",
-                    "elements": [{"tag": "plain_text", "content": "Source: Coingecko | HackerNews | ArXiv"}]
-                }
-            ]
-        }
-    }
-    requests.post(FEISHU_WEBHOOK, json=payload)
-    print("推送成功")
+    if send_to_feishu(msgs):
+        # 卡片已进发件箱，游标可以前移了
+        local_store.commit_cursors()
+    else:
+        local_store.discard_cursors()
 
 if __name__ == "__main__":
-    msgs = []
-    
-    # 1. Crypto (如果不想要可以注释掉)
-    msgs.append(get_crypto_price())
-    
-    # 2. Hacker News
-    msgs.append(get_hacker_news())
-    
-    # 3. ArXiv Papers
-    msgs.append(get_arxiv_papers())
-    
-    send_to_feishu(msgs)
\ No newline at end of file
+    run()
@@ -0,0 +1,79 @@
+import os
+import threading
+import time
+
+import local_store
+import metrics
+
+# ================= 配置 =================
+# 整次运行的总预算 (秒)：所有来源并发执行，超过预算还没返回的来源直接丢弃
+RUN_DEADLINE = float(os.getenv("RUN_DEADLINE", "25"))
+# =======================================
+
+# 当前这次 run_sources 的截止时间 (monotonic)，来源里的请求据此判断还来不来得及；
+# run_sources 返回后清空，之后运行的 bot 不受上一次预算的影响
+_run_end = None
+
+def time_left():
+    """距离本次运行截止还剩多少秒；不在 run_sources 里运行 (单独调试数据源) 时返回 None"""
+    if _run_end is None:
+        return None
+    return max(0.0, _run_end - time.monotonic())
+
+def run_sources(sources, deadline=None):
+    """
+    并发执行多个数据源，整体受一个截止时间约束
+
+    sources: [(name, func), ...]，顺序就是卡片里的板块顺序
+    返回 (results, late):
+      results 与 sources 一一对应 (超时或异常的来源为 None)，保持配置顺序
+      late    是没在截止时间内完成的来源名称列表
+    迟到的来源暂存的增量游标会被作废 (内容没进卡片，下次还要重新抓)
+    """
+    global _run_end
+    deadline = RUN_DEADLINE if deadline is None else deadline
+    results = [None] * len(sources)
+    finished = [False] * len(sources)
+    cond = threading.Condition()
+
+    def worker(index, name, func):
+        try:
+            value = func()
+        except Exception as e:
+            print(f"❌ {name} 执行异常: {e}")
+            value = None
+        with cond:
+            results[index] = value
+            finished[index] = True
+            cond.notify_all()
+
+    # 注册过的数据源用注册名暂存游标 (见 registry.source)
+    owners = [getattr(func, "source_name", None) for _, func in sources]
+    local_store.accept_cursors(owners)
+
+    start = time.monotonic()
+    end = _run_end = start + deadline
+    for index, (name, func) in enumerate(sources):
+        # 用守护线程而不是 ThreadPoolExecutor：线程池在解释器退出时会 join 所有线程，
+        # 迟到的来源会把进程拖到它自己的超时结束，守护线程则直接被丢弃
+        t = threading.Thread(target=worker, args=(index, name, func), name=f"source-{name}", daemon=True)
+        t.start()
+
+    with cond:
+        while not all(finished):
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                break
+            cond.wait(remaining)
+        values = list(results)
+        late = [name for (name, _), done in zip(sources, finished) if not done]
+        local_store.discard_cursors(owner for owner, done in zip(owners, finished) if owner and not done)
+    _run_end = None
+
+    elapsed = time.monotonic() - start
+    if late:
+        print(f"⏰ 以下来源超过 {deadline:g}s 预算被丢弃: {', '.join(late)}")
+        for name in late:
+            metrics.emit("deadline", source=name, status="late", latency_ms=round(elapsed * 1000, 1))
+    print(f"⏱️ {len(sources) - len(late)}/{len(sources)} 个来源按时完成，用时 {elapsed:.1f}s")
+    return values, late
@@ -0,0 +1,117 @@
+import argparse
+import os
+import sqlite3
+import time
+
+import local_store
+
+# 飞书推送发件箱：
+# 渲染好的卡片先写进 .cache/outbox.sqlite，再由 feishu.drain_outbox 按限速逐张发送；
+# 发送成功才删除，失败的卡片留在库里，下次运行 (任意 bot) 时先补发旧卡片再发新的。
+# 这里只存标题/内容/模板，签名在真正发送时才生成 (飞书要求时间戳在 1 小时内)
+#   python outbox.py            查看队列深度和最早卡片的等待时间
+#   python outbox.py --list     列出所有待发送卡片
+#   python outbox.py drain      立即补发
+
+# ================= 配置 =================
+OUTBOX_FILE = "outbox.sqlite"
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+# 超过这个时间还没发出去的卡片直接丢弃 (过期的日报没有补发的意义)
+OUTBOX_MAX_AGE = int(os.getenv("OUTBOX_MAX_AGE", str(48 * 3600)))
+# =======================================
+
+def connect():
+    conn = sqlite3.connect(local_store.cache_path(OUTBOX_FILE))
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            content TEXT NOT NULL,
+            template TEXT NOT NULL,
+            note TEXT,
+            created_at REAL NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT
+        )
+    """)
+    return conn
+
+def enqueue(cards):
+    """
+    cards: [(title, content, template, note), ...]
+    按顺序入队，返回新卡片的 id 列表
+    """
+    now = time.time()
+    conn = connect()
+    try:
+        with conn:
+            ids = [conn.execute("INSERT INTO outbox (title, content, template, note, created_at) VALUES (?, ?, ?, ?, ?)",
+                                (title, content, template, note, now)).lastrowid
+                   for title, content, template, note in cards]
+    finally:
+        conn.close()
+    return ids
+
+def pending(conn):
+    """按入队顺序返回待发送的卡片 [(id, title, content, template, note, attempts, created_at, last_error), ...]"""
+    return conn.execute("SELECT id, title, content, template, note, attempts, created_at, last_error "
+                        "FROM outbox ORDER BY id").fetchall()
+
+def mark_sent(conn, card_id):
+    with conn:
+        conn.execute("DELETE FROM outbox WHERE id = ?", (card_id,))
+
+def mark_dead(conn, card_id):
+    """被飞书明确拒收的卡片 (请求体不合法等)：直接删除，不再挡住后面的卡片"""
+    mark_sent(conn, card_id)
+
+def mark_failed(conn, card_id, error):
+    with conn:
+        conn.execute("UPDATE outbox SET attempts = attempts + 1, last_error = ? WHERE id = ?",
+                     (str(error)[:500], card_id))
+
+def expire(conn):
+    """丢弃重试次数用完或者等待太久的卡片，返回被丢弃的标题列表"""
+    cutoff = time.time() - OUTBOX_MAX_AGE
+    where = "attempts >= ? OR created_at < ?"
+    params = (OUTBOX_MAX_ATTEMPTS, cutoff)
+    dropped = [row[0] for row in conn.execute(f"SELECT title FROM outbox WHERE {where}", params)]
+    if dropped:
+        with conn:
+            conn.execute(f"DELETE FROM outbox WHERE {where}", params)
+    return dropped
+
+def stats(conn=None):
+    """返回 (队列深度, 最早一张卡片的等待秒数)，队列为空时等待时间为 0"""
+    own = conn is None
+    conn = conn or connect()
+    try:
+        depth, oldest = conn.execute("SELECT COUNT(*), MIN(created_at) FROM outbox").fetchone()
+    finally:
+        if own:
+            conn.close()
+    return depth, (time.time() - oldest) if oldest else 0.0
+
+def format_stats(depth, age):
+    if not depth:
+        return "📭 发件箱为空"
+    return f"📮 发件箱待发送 {depth} 张，最早一张已等待 {age / 60:.1f} 分钟"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="飞书推送发件箱")
+    parser.add_argument("command", nargs="?", choices=["stats", "drain"], default="stats")
+    parser.add_argument("--list", action="store_true", help="列出待发送卡片")
+    args = parser.parse_args()
+
+    if args.command == "drain":
+        import feishu
+        feishu.drain_outbox()
+    else:
+        conn = connect()
+        print(format_stats(*stats(conn)))
+        if args.list:
+            now = time.time()
+            for card_id, title, _, _, _, attempts, created_at, last_error in pending(conn):
+                print(f"  #{card_id} {title}  等待 {(now - created_at) / 60:.1f} 分钟，已尝试 {attempts} 次"
+                      + (f"，上次错误: {last_error}" if last_error else ""))
+        conn.close()
@@ -1,60 +1,68 @@
-import requests
-import feedparser
-import json
-import os
+import http_client
+import feishu
+import registry
+import feed_cache
+import local_store
+import prompt_history
+import sanitize
+import circuit
 import time
-import hmac
-import hashlib
-import base64
 
 # ================= 配置区域 =================
-# 建议从环境变量读取，本地测试可以直接填字符串
-FEISHU_WEBHOOK = os.getenv("FEISHU_WEBHOOK")
-FEISHU_SECRET = os.getenv("FEISHU_SECRET")
+# 飞书 Webhook / 密钥 由 feishu 模块统一从环境变量读取
+# 每个来源每次推送几条没推过的 Prompt
+REDDIT_TOP_N = 3
+CIVITAI_TOP_N = 3
+# 已推送 ID 只保留最近这么多个 (写在 .cache/cursors.json)
+REDDIT_SEEN_CAP = 300
+CIVITAI_SEEN_CAP = 500
+# Civitai 每页条数 / 最多翻几页 (热榜前几名天天一样，往后翻才有新的)
+CIVITAI_PAGE_SIZE = 10
+CIVITAI_MAX_PAGES = 3
 # ===========================================
 
-def gen_sign(timestamp, secret):
-    """
-    飞书签名生成算法 (HMAC-SHA256)
-    """
-    string_to_sign = '{}\n{}'.format(timestamp, secret)
-    hmac_code = hmac.new(string_to_sign.encode("utf-8"), digestmod=hashlib.sha256).digest()
-    sign = base64.b64encode(hmac_code).decode('utf-8')
-    return sign
-
+@registry.source("prompt.reddit")
 def get_reddit_prompts():
     """
     抓取 Reddit (r/ChatGPTPromptGenius) 每日热门
     """
     url = "https://www.reddit.com/r/ChatGPTPromptGenius/top.rss?t=day"
-    # Reddit 必须伪装 User-Agent，否则报错 429
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
+    # Reddit 必须伪装 User-Agent，否则报错 429 (http_client 默认带浏览器 UA)
     
     print(f"🧠 正在抓取 Reddit: {url} ...")
     try:
-        # feedparser 支持直接传 headers 并不是所有版本都行，建议用 requests 下载内容再解析
-        resp = requests.get(url, headers=headers, timeout=15)
-        feed = feedparser.parse(resp.content)
+        # 用 requests 下载再解析 (带 ETag/Last-Modified 条件请求缓存)
+        feed = feed_cache.fetch_feed(url, timeout=15)
         
+        seen = local_store.load_cursor("prompt.reddit", [])
+        seen_set = set(seen)
         prompts = []
-        for entry in feed.entries[:3]: # 只取前3个
-            # 清洗描述，去除 HTML 标签
-            summary = entry.summary.replace('<br>', '\n').replace('<p>', '').replace('</p >', '')
+        pushed_ids = []
+        for entry in feed.entries:
+            entry_id = entry.get('id') or entry.link
+            # 推过的帖子跳过
+            if entry_id in seen_set:
+                continue
+            if len(prompts) >= REDDIT_TOP_N: # 只取前几个
+                break
+            pushed_ids.append(entry_id)
+            # 清洗描述，去除 HTML 标签和注释 (<!-- SC_OFF --><div class="md">...)，截取摘要
+            summary = sanitize.html_to_text(entry.summary, limit=120)
             
             prompts.append({
                 "source": "🧠 ChatGPT / Reddit",
                 "title": entry.title[:50], # 标题限制长度
                 "url": entry.link,
-                "desc": summary[:120] + "..." # 截取摘要
+                "desc": summary
             })
-        print(f"✅ Reddit 获取到 {len(prompts)} 条")
+        local_store.stage_cursor("prompt.reddit", local_store.remember_ids(seen, pushed_ids, REDDIT_SEEN_CAP))
+        print(f"✅ Reddit 获取到 {len(prompts)} 条新内容")
         return prompts
     except Exception as e:
         print(f"❌ Reddit 抓取失败: {e}")
         return []
 
+@registry.source("prompt.civitai")
 def get_civitai_prompts():
     """
     抓取 Civitai (C站) 每日最热图片 Prompt
@@ -63,132 +71,124 @@ def get_civitai_prompts():
     params = {
         "sort": "Most Reactions", # 点赞最多
         "period": "Day",          # 24小时内
-        "limit": 3,               # 取3个
+        "limit": CIVITAI_PAGE_SIZE,
         "nsfw": "false"           # 过滤成人内容
     }
     
-    print(f"🎨 正在抓取 Civitai ...")
+    # C站接口经常 5xx / 超时，连续失败时熔断一段时间，直接跳过
+    if circuit.timeout("civitai", 15) is None:
+        print("⏭️ 剩余时间不够请求 Civitai，跳过")
+        return []
+    if not circuit.allow("civitai"):
+        print("⏭️ Civitai 熔断中，跳过")
+        return []
+    print("🎨 正在抓取 Civitai ...")
     try:
-        resp = requests.get(url, params=params, timeout=15)
-        data = resp.json()
-        
+        seen = local_store.load_cursor("prompt.civitai", [])
+        seen_set = set(seen)
         prompts = []
-        for item in data.get('items', []):
-            meta = item.get('meta', {})
-            prompt_text = meta.get('prompt', '无 Prompt 数据')
+        pushed_ids = []
+        # 凑够 CIVITAI_TOP_N 条没推过的就停止翻页
+        for _ in range(CIVITAI_MAX_PAGES):
+            timeout = circuit.timeout("civitai", 15)
+            if timeout is None:
+                print("⏭️ 剩余时间不够继续翻页 Civitai")
+                break
+            start = time.monotonic()
+            resp = http_client.get(url, params=params, timeout=timeout, retries=0)
+            resp.raise_for_status()
+            data = resp.json()
+            circuit.record_success("civitai", time.monotonic() - start)
             
-            # 简单的清洗
-            clean_prompt = str(prompt_text).replace('\n', ' ')[:120]
-            
-            prompts.append({
-                "source": "🎨 Midjourney/SD (Civitai)",
-                "title": f"今日热图 (ID: {item['id']})",
-                "url": f"https://civitai.com/images/{item['id']}",
-                "desc": f"Prompt: {clean_prompt}..."
-            })
-        print(f"✅ Civitai 获取到 {len(prompts)} 条")
+            for item in data.get('items', []):
+                if len(prompts) >= CIVITAI_TOP_N:
+                    break
+                if item['id'] in seen_set:
+                    continue
+                pushed_ids.append(item['id'])
+                meta = item.get('meta') or {}
+                prompt_text = meta.get('prompt', '无 Prompt 数据')
+                
+                # 简单的清洗
+                clean_prompt = str(prompt_text).replace('\n', ' ')[:120]
+                
+                prompts.append({
+                    "source": "🎨 Midjourney/SD (Civitai)",
+                    "title": f"今日热图 (ID: {item['id']})",
+                    "url": f"https://civitai.com/images/{item['id']}",
+                    "desc": f"Prompt: {clean_prompt}..."
+                })
+
+            next_cursor = (data.get('metadata') or {}).get('nextCursor')
+            if len(prompts) >= CIVITAI_TOP_N or not next_cursor:
+                break
+            params["cursor"] = next_cursor
+        local_store.stage_cursor("prompt.civitai", local_store.remember_ids(seen, pushed_ids, CIVITAI_SEEN_CAP))
+        print(f"✅ Civitai 获取到 {len(prompts)} 条新内容")
         return prompts
     except Exception as e:
         print(f"❌ Civitai 抓取失败: {e}")
+        circuit.record_failure("civitai", e)
         return []
 
 def send_to_feishu(content_list):
     """
-    发送到飞书 (带签名)
+    发送到飞书 (签名和发送由 feishu 模块负责)，进了发件箱返回 True
     """
-    if not FEISHU_WEBHOOK:
-        print("❌ 未配置飞书 Webhook")
-        return
-
     print(f"📨 正在推送 {len(content_list)} 条 Prompt...")
 
-    # 1. 生成签名
-    timestamp = str(int(time.time()))
-    sign = gen_sign(timestamp, FEISHU_SECRET)
-
-    # 2. 拼接卡片内容
+    # 拼接卡片内容
     card_elements = []
     for item in content_list:
         # 使用 Markdown 格式
         text = f"**【{item['source']}】**\n[{item['title']}]({item['url']})\n> {item['desc']}"
         card_elements.append(text)
 
-    final_content = "\n\n----------------\n\n".join(card_elements)
+    # 紫色代表创造力
+    return feishu.send_sections("🔥 每日热门 AI Prompts", card_elements, template="purple",
+                     note="数据来源: Reddit & Civitai")
 
-    # 3. 构建 Payload
-    payload = {
-        "timestamp": timestamp,
-        "sign": sign,
-        "msg_type": "interactive",
-        "card": {
-            "header": {
-                "title": {
-                    "tag": "plain_text",
-                    "content": "🔥 每日热门 AI Prompts"
-                },
-                "template": "purple" # 紫色代表创造力
-            },
-            "elements": [
-                {
-                    "tag": "markdown",
-                    "content": final_content
-                },
-                {
-                    "tag": "note",
-                    "elements": [
-                        {"tag": "plain_text", "content": "数据来源: Reddit & Civitai"}
-                    ]
-                }
-            ]
-        }
-    }
+def drop_near_duplicates(content_list):
+    """
+    去掉和历史库里高度相似 (但换了 URL) 的 Prompt，卡片和历史库都不再重复
+    返回 [(item, sig), ...]
+    """
+    # 第一次运行时把旧版 prompts_history.json 迁移过来
+    prompt_history.migrate_legacy()
 
-    # 4. 发送
+    import prompt_dedup  # 依赖 numpy，用到时才导入
+    index = prompt_dedup.NearDuplicateIndex()
     try:
-        resp = requests.post(FEISHU_WEBHOOK, json=payload)
-        result = resp.json()
-        if result.get("code") == 0:
-            print("✅ 推送成功！")
-        else:
-            print(f"❌ 推送失败: {result}")
-    except Exception as e:
-        print(f"❌ 网络请求出错: {e}")
+        return prompt_dedup.filter_near_duplicates(content_list, index)
+    finally:
+        index.close()
 
-def save_to_local(content_list):
+def save_to_local(kept):
     """
-    将抓取到的 Prompt 追加保存到本地 JSON 文件中
+    将抓取到的 Prompt 追加保存到本地历史库 (jsonl，只追加)
+    kept: drop_near_duplicates 的返回值 [(item, sig), ...]
+    去重靠 prompts_index/ 里的 URL 哈希索引，不再整份读入旧数据；
+    新条目同步写入 LSH 近似去重索引和全文检索索引
     """
-    file_path = "prompts_history.json"
-    
-    # 1. 如果文件不存在，创建一个空的列表
-    if not os.path.exists(file_path):
-        existing_data = []
-    else:
-        # 2. 如果文件存在，先读取旧数据
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                existing_data = json.load(f)
-        except json.JSONDecodeError:
-            existing_data = []
-
-    # 3. 简单的去重逻辑（防止同一条数据存两遍）
-    # 我们用 URL 作为唯一标识
-    existing_urls = {item['url'] for item in existing_data}
-    new_items = [item for item in content_list if item['url'] not in existing_urls]
-
+    import prompt_dedup
+    import prompt_search
+    sigs = {id(item): sig for item, sig in kept}
+    # 先打开 (并对齐) 近似去重索引再追加，新条目直接复用算好的签名
+    index = prompt_dedup.NearDuplicateIndex()
+    try:
+        new_items = prompt_history.append_items([item for item, _ in kept])
+        for offset, item in new_items:
+            index.add(offset, sigs[id(item)], commit=False)
+        index.commit()
+    finally:
+        index.close()
     if new_items:
-        # 4. 追加新数据
-        # 把新数据放在最前面（倒序），方便查看最新
-        updated_data = new_items + existing_data
-        
-        # 5. 写入文件
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(updated_data, f, ensure_ascii=False, indent=2)
-        print(f"💾 已保存 {len(new_items)} 条新 Prompt 到 {file_path}")
+        prompt_search.index_items(new_items)
+        print(f"💾 已保存 {len(new_items)} 条新 Prompt 到 {prompt_history.HISTORY_FILE}")
     else:
         print("💾 没有新数据需要保存")
 
-if __name__ == "__main__":
+def run():
     # 1. 抓取数据
     all_prompts = []
     
@@ -198,11 +198,23 @@ if __name__ == "__main__":
     # 抓取 Civitai
     all_prompts.extend(get_civitai_prompts())
     
-    # 2. 推送
-    if all_prompts:
-        # 1. 先发飞书
-        send_to_feishu(all_prompts)
-        # 2. 【新增】再存本地
-        save_to_local(all_prompts) 
+    # 2. 去掉换了 URL 的近似重复
+    kept = drop_near_duplicates(all_prompts)
+    all_prompts = [item for item, _ in kept]
+
+    # 3. 推送
+    if not all_prompts:
+        print("今日无数据抓取成功")
+        # 没有要推送的 (或者全是近似重复)，游标照常前移
+        local_store.commit_cursors()
+    # 1. 先发飞书
+    elif send_to_feishu(all_prompts):
+        # 2. 【新增】卡片已进发件箱，再存本地，游标可以前移了
+        save_to_local(kept)
+        local_store.commit_cursors()
     else:
-        print("今日无数据抓取成功")
\ No newline at end of file
+        # 没能入队：不存历史库、不移游标，下次重新抓取推送
+        local_store.discard_cursors()
+
+if __name__ == "__main__":
+    run()
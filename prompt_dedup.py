@@ -0,0 +1,168 @@
+import hashlib
+import os
+import re
+import sqlite3
+import zlib
+
+import numpy as np
+
+import local_store
+import prompt_history
+
+# Prompt 近似去重 (MinHash + LSH)：
+# 同一个 Prompt 经常换个 Reddit 链接重发，或者 Civitai 上几张图的 meta.prompt 几乎一样，
+# 只按 URL 去重挡不住。这里给每条 Prompt 算 MinHash 签名，按 band 切分后放进 LSH 桶，
+# 新数据只需要查自己落到的那几个桶 (SQLite 索引查找)，再用签名估算相似度，不用和全库逐条比较。
+# 索引完全可以从 prompts_history.jsonl 推导出来，放在 .cache/ 里随 actions/cache 保留，不提交到仓库；
+# 打开时对比记录的历史库大小，缺了就补上新增的部分 (缓存丢失 / 历史库被改写则整个重建)。
+
+# ================= 配置 =================
+LSH_FILE = "prompts_lsh.sqlite"
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.8"))
+NUM_PERM = 128
+BANDS = 32            # 32 个 band x 4 行，相似度约 0.42 以上的才会成为候选
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+# =======================================
+
+_PRIME = np.uint64(4294967291)  # < 2^32，保证 a * x 不会溢出 uint64
+_rng = np.random.RandomState(20240101)  # 固定种子：签名必须在每次运行之间可比
+_PERM_A = _rng.randint(1, int(_PRIME), size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, int(_PRIME), size=NUM_PERM, dtype=np.uint64)
+
+_TAG_RE = re.compile(r'<[^>]*>')
+_SPACE_RE = re.compile(r'\s+')
+
+def prompt_text(item):
+    """参与比较的文本：标题 + 描述，去掉 HTML 标签、统一大小写和空白"""
+    text = f"{item.get('title', '')} {item.get('desc', '')}"
+    text = _TAG_RE.sub(' ', text).lower()
+    return _SPACE_RE.sub(' ', text).strip()
+
+def signature(text):
+    """字符 5-gram (对中英文都适用) 的 MinHash 签名，返回 NUM_PERM 个 uint32"""
+    if len(text) <= SHINGLE_SIZE:
+        shingles = {text}
+    else:
+        shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    permuted = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % _PRIME
+    return permuted.min(axis=1).astype(np.uint32)
+
+def similarity(sig_a, sig_b):
+    """用签名估算 Jaccard 相似度"""
+    return float(np.mean(sig_a == sig_b))
+
+def _band_keys(sig):
+    rows = sig.reshape(BANDS, ROWS)
+    # 每个 band 压成一个 56 位整数作为桶号 (SQLite INTEGER 是有符号 64 位)
+    return [(band, int.from_bytes(hashlib.blake2b(row.tobytes(), digest_size=7).digest(), 'big'))
+            for band, row in enumerate(rows)]
+
+class NearDuplicateIndex:
+    """
+    持久化在 .cache/prompts_lsh.sqlite 里的 LSH 索引
+    sigs: 每条历史记录的签名 (offset 是它在 prompts_history.jsonl 里的字节偏移)
+    lsh:  (band, key) -> offset，(band, key, offset) 唯一索引，查询是 O(log N)，重复加入同一条不会多出桶记录
+    meta: 已经索引到的历史库字节数 (history_size)
+    """
+    def __init__(self, path=None, threshold=None):
+        self.threshold = NEAR_DUP_THRESHOLD if threshold is None else threshold
+        self.conn = sqlite3.connect(path or local_store.cache_path(LSH_FILE))
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sigs (offset INTEGER PRIMARY KEY, sig BLOB NOT NULL);
+            CREATE TABLE IF NOT EXISTS lsh (band INTEGER NOT NULL, key INTEGER NOT NULL, offset INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+        """)
+        self._ensure_unique()
+        self.sync()
+
+    def close(self):
+        self.conn.close()
+
+    def _ensure_unique(self):
+        """旧版索引 lsh 表没有唯一约束，可能有重复行：先去重再建唯一索引 (它也覆盖 (band, key) 查询)"""
+        if self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'lsh_unique'").fetchone():
+            return
+        self.conn.executescript("""
+            DELETE FROM lsh WHERE rowid NOT IN (SELECT MIN(rowid) FROM lsh GROUP BY band, key, offset);
+            DROP INDEX IF EXISTS lsh_bucket;
+            CREATE UNIQUE INDEX lsh_unique ON lsh (band, key, offset);
+        """)
+
+    def _indexed_size(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'history_size'").fetchone()
+        return row[0] if row else None
+
+    def commit(self):
+        """提交并记下已经索引到的历史库大小 (调用方要先把新追加的条目都 add 进来)"""
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('history_size', ?)", (prompt_history.history_size(),))
+        self.conn.commit()
+
+    def sync(self):
+        """和历史库对齐：没索引过 / 历史库变小了就重建，落后就只补新增的部分"""
+        indexed = self._indexed_size()
+        size = prompt_history.history_size()
+        if indexed is None or indexed > size:
+            self.rebuild()
+        elif indexed < size:
+            count = self._index_history(start=indexed)
+            self.commit()
+            print(f"🧬 MinHash 索引补上 {count} 条新 Prompt")
+
+    def _index_history(self, start=0):
+        count = 0
+        for offset, item in prompt_history.iter_history(with_offset=True, start=start):
+            self.add(offset, signature(prompt_text(item)), commit=False)
+            count += 1
+        return count
+
+    def rebuild(self):
+        """从历史库重新建立索引 (缓存里没有索引时自动执行)"""
+        self.conn.execute("DELETE FROM sigs")
+        self.conn.execute("DELETE FROM lsh")
+        count = self._index_history()
+        self.commit()
+        print(f"🧬 已为 {count} 条历史 Prompt 建立 MinHash 索引")
+
+    def add(self, offset, sig, commit=True):
+        self.conn.execute("INSERT OR REPLACE INTO sigs VALUES (?, ?)", (offset, sig.tobytes()))
+        self.conn.executemany("INSERT OR IGNORE INTO lsh VALUES (?, ?, ?)",
+                              [(band, key, offset) for band, key in _band_keys(sig)])
+        if commit:
+            self.commit()
+
+    def query(self, sig):
+        """返回与 sig 最相似且超过阈值的历史记录 (offset, 相似度)，没有则返回 None"""
+        candidates = set()
+        for band, key in _band_keys(sig):
+            rows = self.conn.execute("SELECT offset FROM lsh WHERE band = ? AND key = ?", (band, key))
+            candidates.update(offset for (offset,) in rows)
+
+        best = None
+        for offset in candidates:
+            (blob,) = self.conn.execute("SELECT sig FROM sigs WHERE offset = ?", (offset,)).fetchone()
+            score = similarity(sig, np.frombuffer(blob, dtype=np.uint32))
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (offset, score)
+        return best
+
+def filter_near_duplicates(items, index):
+    """
+    去掉和历史库 (或同一批里前面的条目) 高度相似、但 URL 不同的 Prompt
+    返回 [(item, sig), ...]，sig 留着入库时用
+    URL 相同的交给 prompt_history 的 URL 索引处理，这里不当作近似重复
+    """
+    kept = []
+    for item in items:
+        sig = signature(prompt_text(item))
+        match = index.query(sig)
+        if match and prompt_history.read_at(match[0]).get('url') != item['url']:
+            print(f"🪞 跳过近似重复 ({match[1]:.0%}): {item['title']}")
+            continue
+        dup = next((k for k, s in kept if similarity(sig, s) >= index.threshold), None)
+        if dup is not None:
+            print(f"🪞 跳过同批近似重复: {item['title']}")
+            continue
+        kept.append((item, sig))
+    return kept
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+
+# Prompt 历史库 (只追加)：
+#   prompts_history.jsonl  每行一条 Prompt，从旧到新
+#   prompts_index/xx.idx   按 URL 哈希前两位分成 256 个分片，每行一个 16 位十六进制哈希
+# 每次运行只读新数据落到的那几个分片、只在文件末尾追加，
+# 读写开销只跟新数据条数有关，git 里也只多出新增的几行
+
+# ================= 配置 =================
+HISTORY_FILE = "prompts_history.jsonl"
+INDEX_DIR = "prompts_index"
+LEGACY_FILE = "prompts_history.json"
+# =======================================
+
+def url_hash(url):
+    return hashlib.blake2b(url.encode("utf-8"), digest_size=8).hexdigest()
+
+def _shard_path(h):
+    return os.path.join(INDEX_DIR, f"{h[:2]}.idx")
+
+def _read_shard(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return {line.strip() for line in f if line.strip()}
+    except FileNotFoundError:
+        return set()
+
+def known_hashes(hashes):
+    """返回 hashes 里已经存在于索引中的那些 (只读取相关分片)"""
+    shards = {}
+    for h in hashes:
+        shards.setdefault(h[:2], []).append(h)
+    known = set()
+    for prefix, group in shards.items():
+        existing = _read_shard(_shard_path(prefix))
+        known.update(h for h in group if h in existing)
+    return known
+
+def _append_index(hashes):
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    shards = {}
+    for h in hashes:
+        shards.setdefault(h[:2], []).append(h)
+    for prefix, group in shards.items():
+        with open(_shard_path(prefix), 'a', encoding='utf-8') as f:
+            f.write("".join(h + "\n" for h in group))
+
+def append_items(items):
+    """
+    追加新的 Prompt (按 url 去重，包括同一批里的重复)
+    返回 [(offset, item), ...]：offset 是这条记录在 jsonl 里的字节偏移，可以用 read_at 直接定位
+    """
+    hashes = [url_hash(item['url']) for item in items]
+    known = known_hashes(hashes)
+
+    new_items, new_hashes = [], []
+    for h, item in zip(hashes, items):
+        if h in known:
+            continue
+        known.add(h)
+        new_items.append(item)
+        new_hashes.append(h)
+    if not new_items:
+        return []
+
+    appended = []
+    with open(HISTORY_FILE, 'ab') as f:
+        offset = f.seek(0, os.SEEK_END)
+        for item in new_items:
+            line = (json.dumps(item, ensure_ascii=False) + "\n").encode("utf-8")
+            f.write(line)
+            appended.append((offset, item))
+            offset += len(line)
+    # 先写数据再写索引：中途失败最多导致下次重复保存，不会丢数据
+    _append_index(new_hashes)
+    return appended
+
+def history_size():
+    """历史库当前的字节数 (只追加，派生索引用它判断自己落后了多少)"""
+    return os.path.getsize(HISTORY_FILE) if os.path.exists(HISTORY_FILE) else 0
+
+def iter_history(with_offset=False, start=0):
+    """
+    流式读取历史记录 (从旧到新)，不会把整个文件读进内存
+    with_offset=True 时产出 (offset, item)；start 从这个字节偏移 (某一行的开头) 开始读
+    """
+    if not os.path.exists(HISTORY_FILE):
+        return
+    with open(HISTORY_FILE, 'rb') as f:
+        f.seek(start)
+        offset = start
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                yield (offset, item) if with_offset else item
+            offset += len(line)
+
+def read_at(offset):
+    """按字节偏移读取一条记录"""
+    with open(HISTORY_FILE, 'rb') as f:
+        f.seek(offset)
+        return json.loads(f.readline())
+
+def migrate_legacy(legacy_file=LEGACY_FILE):
+    """
+    一次性迁移：把旧的 prompts_history.json (新的在前) 转成 jsonl (旧的在前) 并建立索引
+    jsonl 已经存在时什么都不做，返回迁移的条数
+    """
+    if os.path.exists(HISTORY_FILE) or not os.path.exists(legacy_file):
+        return 0
+    try:
+        with open(legacy_file, 'r', encoding='utf-8') as f:
+            legacy = json.load(f)
+    except json.JSONDecodeError:
+        legacy = []
+    appended = append_items(list(reversed(legacy)))
+    print(f"📦 已将 {legacy_file} 中的 {len(appended)} 条记录迁移到 {HISTORY_FILE}")
+    return len(appended)
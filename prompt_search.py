@@ -0,0 +1,165 @@
+import argparse
+import math
+import re
+import sqlite3
+import time
+from collections import Counter
+
+import local_store
+import prompt_history
+
+# Prompt 库全文检索：
+# 对 title / desc 建倒排索引 (.cache/prompts_search.sqlite)，save_to_local 追加数据时增量更新。
+# 索引由 prompts_history.jsonl 推导，不提交到仓库：打开时对比记录的历史库大小，缺了就补上，
+# 缓存丢失 / 历史库被改写则整个重建。
+# 中文按字符二元组 (bigram) 切分，英文/数字按单词切分，结果按 BM25 排序。
+# 查询只读取查询词的倒排表和命中文档的长度，最后按字节偏移取回前 K 条，不加载整个历史库。
+
+# ================= 配置 =================
+SEARCH_FILE = "prompts_search.sqlite"
+BM25_K1 = 1.2
+BM25_B = 0.75
+TITLE_WEIGHT = 2   # 标题里的词按出现 2 次计
+# =======================================
+
+_TAG_RE = re.compile(r'<[^>]*>')
+_TOKEN_RE = re.compile(r'[a-z0-9]+|[\u3400-\u9fff\uf900-\ufaff]+')
+_CJK_RE = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]')
+
+def tokenize(text):
+    """英文/数字按单词，中文连续片段切成字符 bigram (单字片段保留单字)"""
+    tokens = []
+    for chunk in _TOKEN_RE.findall(_TAG_RE.sub(' ', text or '').lower()):
+        if _CJK_RE.match(chunk):
+            if len(chunk) == 1:
+                tokens.append(chunk)
+            else:
+                tokens.extend(chunk[i:i + 2] for i in range(len(chunk) - 1))
+        else:
+            tokens.append(chunk)
+    return tokens
+
+def _doc_terms(item):
+    terms = Counter(tokenize(item.get('desc', '')))
+    for token in tokenize(item.get('title', '')):
+        terms[token] += TITLE_WEIGHT
+    return terms
+
+class SearchIndex:
+    def __init__(self, path=None):
+        self.conn = sqlite3.connect(path or local_store.cache_path(SEARCH_FILE))
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS postings (term TEXT NOT NULL, offset INTEGER NOT NULL, tf INTEGER NOT NULL);
+            CREATE INDEX IF NOT EXISTS postings_term ON postings (term);
+            CREATE TABLE IF NOT EXISTS docs (offset INTEGER PRIMARY KEY, length INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS stats (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+        """)
+        self.caught_up = self.sync()
+
+    def close(self):
+        self.conn.close()
+
+    def _stats(self):
+        stats = dict(self.conn.execute("SELECT key, value FROM stats"))
+        return stats.get('docs', 0), stats.get('total_length', 0)
+
+    def _mark_synced(self):
+        self.conn.execute("INSERT OR REPLACE INTO stats VALUES ('history_size', ?)", (prompt_history.history_size(),))
+        self.conn.commit()
+
+    def sync(self):
+        """和历史库对齐：没索引过 / 历史库变小了就重建，落后就只补新增的部分，返回补上的条数"""
+        indexed = dict(self.conn.execute("SELECT key, value FROM stats")).get('history_size')
+        size = prompt_history.history_size()
+        if indexed is None or indexed > size:
+            return self.rebuild()
+        if indexed == size:
+            return 0
+        count = self.add_items(prompt_history.iter_history(with_offset=True, start=indexed))
+        self._mark_synced()
+        print(f"🔎 全文索引补上 {count} 条新 Prompt")
+        return count
+
+    def rebuild(self):
+        """从历史库重建索引 (缓存里没有索引时自动执行)"""
+        for table in ("postings", "docs", "stats"):
+            self.conn.execute(f"DELETE FROM {table}")
+        count = self.add_items(prompt_history.iter_history(with_offset=True))
+        self._mark_synced()
+        print(f"🔎 已为 {count} 条历史 Prompt 建立全文索引")
+        return count
+
+    def add_items(self, offset_items):
+        """增量加入 [(offset, item), ...]，已经索引过的 offset 会跳过"""
+        docs, total_length = self._stats()
+        added = 0
+        for offset, item in offset_items:
+            if self.conn.execute("SELECT 1 FROM docs WHERE offset = ?", (offset,)).fetchone():
+                continue
+            terms = _doc_terms(item)
+            length = sum(terms.values())
+            self.conn.execute("INSERT INTO docs VALUES (?, ?)", (offset, length))
+            self.conn.executemany("INSERT INTO postings VALUES (?, ?, ?)",
+                                  [(term, offset, tf) for term, tf in terms.items()])
+            docs += 1
+            total_length += length
+            added += 1
+        self.conn.executemany("INSERT OR REPLACE INTO stats VALUES (?, ?)",
+                              [('docs', docs), ('total_length', total_length)])
+        self.conn.commit()
+        return added
+
+    def search(self, query, k=10):
+        """BM25 排序，返回 [(score, offset), ...]"""
+        docs, total_length = self._stats()
+        terms = set(tokenize(query))
+        if not docs or not terms:
+            return []
+        avgdl = total_length / docs
+
+        scores = Counter()
+        lengths = {}
+        for term in terms:
+            postings = self.conn.execute("SELECT offset, tf FROM postings WHERE term = ?", (term,)).fetchall()
+            if not postings:
+                continue
+            idf = math.log(1 + (docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            missing = [offset for offset, _ in postings if offset not in lengths]
+            for i in range(0, len(missing), 500):
+                chunk = missing[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                lengths.update(self.conn.execute(f"SELECT offset, length FROM docs WHERE offset IN ({marks})", chunk))
+            for offset, tf in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[offset] / avgdl)
+                scores[offset] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return [(score, offset) for offset, score in scores.most_common(k)]
+
+def index_items(offset_items):
+    """save_to_local 追加新数据后调用，增量更新全文索引 (打开时的 sync 已经会补上它们)"""
+    index = SearchIndex()
+    try:
+        added = index.caught_up + index.add_items(offset_items)
+        index._mark_synced()
+        return added
+    finally:
+        index.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="搜索 Prompt 历史库")
+    parser.add_argument("query", nargs="?", help="查询内容 (中英文都可以)")
+    parser.add_argument("-k", type=int, default=10, help="返回条数")
+    parser.add_argument("--rebuild", action="store_true", help="从历史库重建索引")
+    args = parser.parse_args()
+
+    index = SearchIndex()
+    if args.rebuild:
+        index.rebuild()
+    if args.query:
+        start = time.perf_counter()
+        hits = index.search(args.query, args.k)
+        elapsed = (time.perf_counter() - start) * 1000
+        for rank, (score, offset) in enumerate(hits, 1):
+            item = prompt_history.read_at(offset)
+            print(f"{rank}. [{score:.2f}] {item['title']}\n   {item['url']}")
+        print(f"⏱️ {len(hits)} 条结果，用时 {elapsed:.1f}ms")
+    index.close()
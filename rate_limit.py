@@ -0,0 +1,76 @@
+import threading
+import time
+
+class TokenBucket:
+    """
+    令牌桶限流器 (线程安全)
+    rate: 每秒补充的令牌数；capacity: 桶容量 (允许的突发请求数)
+    """
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens=1):
+        """阻塞直到拿到令牌"""
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def set_rate(self, rate):
+        """调整补充速度 (先按旧速度结算已经积累的令牌)"""
+        with self.lock:
+            self._refill()
+            self.rate = float(rate)
+
+class AdaptiveRateLimiter:
+    """
+    自适应限流器 (AIMD)：成功时线性提速，失败/被限流时速度减半
+    用来代替固定的 time.sleep，让抓取速度贴着上游能承受的上限走
+    """
+    def __init__(self, rate, min_rate=0.5, max_rate=20.0, increase=0.5, decrease=0.5):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.bucket = TokenBucket(rate, capacity=1)
+        self.lock = threading.Lock()
+
+    @property
+    def rate(self):
+        return self.bucket.rate
+
+    def acquire(self):
+        self.bucket.acquire()
+
+    def on_success(self):
+        with self.lock:
+            self.bucket.set_rate(min(self.max_rate, self.bucket.rate + self.increase))
+
+    def on_failure(self):
+        with self.lock:
+            self.bucket.set_rate(max(self.min_rate, self.bucket.rate * self.decrease))
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+def get_bucket(key, rate, capacity=None):
+    """按 key (通常是 host) 取共享的令牌桶，第一次调用时创建"""
+    with _buckets_lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(rate, capacity)
+            _buckets[key] = bucket
+    return bucket
@@ -0,0 +1,71 @@
+import importlib
+from functools import wraps
+
+import metrics
+
+# 数据源插件注册表：
+# 各 bot 里的抓取函数用 @registry.source("bot.name") 注册自己，
+# runner.py 按名字找到 bot 模块 / 数据源，在同一个进程里运行任意组合，
+# 共用 http_client 的连接池、本地缓存和飞书发送器。
+# 注册时顺带套一层 metrics.stage：每次抓取都记录耗时 / 条目数 / 是否异常，
+# 期间发出的 HTTP 请求也会标注上这个数据源名；抓取函数吞掉了异常时，
+# 按期间上游请求的成败判断这次抓取算不算失败 (见 metrics.upstream_outcomes)。
+
+# bot 名称 -> 模块名 (模块只在真正要运行时才导入)
+BOT_MODULES = {
+    "github": "main",
+    "news": "news_bot",
+    "trend": "trend_bot",
+    "social": "social_bot",
+    "prompt": "prompt_bot",
+    "x": "x_bot",
+    "stock": "stock_bot",
+}
+
+# "bot.source" -> 抓取函数
+SOURCES = {}
+
+def source(name):
+    """装饰器：把抓取函数注册为数据源插件，名字格式为 "bot.source" """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            ok_before, failed_before = metrics.upstream_outcomes(name)
+            with metrics.stage("fetch", source=name) as record:
+                value = func(*args, **kwargs)
+                record["items"] = metrics.count_items(value)
+                ok, failed = metrics.upstream_outcomes(name)
+                ok, failed = ok - ok_before, failed - failed_before
+                # 抓取函数自己用 metrics.mark_failed 标记过的保持 error
+                if record.get("status") != "error":
+                    if failed and (not ok or not value):
+                        record["status"] = "error"
+                        record["error"] = f"上游请求失败 {failed}/{ok + failed} 次"
+                    elif not value:
+                        record["status"] = "empty"
+                return value
+        wrapper.source_name = name
+        SOURCES[name] = wrapper
+        return wrapper
+    return decorator
+
+def load_bot(name):
+    """导入并返回 bot 模块 (导入时模块里的数据源会自动注册)"""
+    if name not in BOT_MODULES:
+        raise KeyError(f"未知的 bot: {name} (可选: {', '.join(BOT_MODULES)})")
+    return importlib.import_module(BOT_MODULES[name])
+
+def get_source(name):
+    """按 "bot.source" 取数据源函数，需要时先导入所属 bot 模块"""
+    if name not in SOURCES:
+        load_bot(name.split(".", 1)[0])
+    if name not in SOURCES:
+        raise KeyError(f"未知的数据源: {name}")
+    return SOURCES[name]
+
+def list_sources(bot_names=None):
+    """列出 (可选地只列出指定 bot 的) 全部数据源名称"""
+    for name in bot_names or BOT_MODULES:
+        load_bot(name)
+    prefixes = tuple(f"{name}." for name in (bot_names or BOT_MODULES))
+    return sorted(name for name in SOURCES if name.startswith(prefixes))
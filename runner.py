@@ -0,0 +1,50 @@
+import argparse
+import time
+
+import http_client
+import registry
+
+# 单进程运行多个 bot：
+#   python runner.py news trend social      依次运行这几个 bot
+#   python runner.py all                    运行全部 bot
+#   python runner.py --list                 列出所有已注册的数据源
+#   python runner.py --source news.hacker_news   只运行单个数据源并打印结果
+# 所有 bot 共用一个解释器、同一套 HTTP 连接池、本地缓存和飞书发送器
+
+def run_bots(names):
+    """依次运行指定的 bot，单个 bot 失败不影响后面的"""
+    results = {}
+    for name in names:
+        start = time.monotonic()
+        print(f"\n===== ▶️ {name} =====")
+        try:
+            registry.load_bot(name).run()
+            results[name] = "ok"
+        except Exception as e:
+            print(f"❌ {name} 运行失败: {e}")
+            results[name] = f"failed: {e}"
+        print(f"===== ⏱️ {name} 用时 {time.monotonic() - start:.1f}s =====")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="在一个进程里运行任意组合的 bot")
+    parser.add_argument("bots", nargs="*", help=f"要运行的 bot: {', '.join(registry.BOT_MODULES)} 或 all")
+    parser.add_argument("--list", action="store_true", help="列出所有数据源")
+    parser.add_argument("--source", action="append", default=[], help="只运行指定数据源 (可重复)")
+    args = parser.parse_args()
+
+    try:
+        if args.list:
+            for name in registry.list_sources(args.bots or None):
+                print(name)
+        for name in args.source:
+            print(f"===== {name} =====")
+            print(registry.get_source(name)())
+        if args.bots:
+            names = list(registry.BOT_MODULES) if args.bots == ["all"] else args.bots
+            results = run_bots(names)
+            print("\n📋 " + " | ".join(f"{name}: {status}" for name, status in results.items()))
+        elif not args.list and not args.source:
+            parser.print_help()
+    finally:
+        http_client.close_all()
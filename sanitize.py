@@ -0,0 +1,72 @@
+import html
+import re
+
+# HTML 摘要转纯文本 (RSS summary / 百科标题等)：
+# 一次扫描完成去标签、去注释、去 <script>/<style>、实体解码和空白合并，
+# 给了 limit 时输出够长就停止扫描，后面的内容不再处理
+
+# 依次匹配：脚本/样式块、注释、标签、实体、普通文本；落单的 < 和 & 当普通字符
+# 没闭合的注释/标签 (被别人截断的摘要) 一直吃到结尾
+_TOKEN_RE = re.compile(
+    r'(?P<skip><(?P<raw>script|style)\b[^>]*>.*?</(?P=raw)\s*>|<!--.*?(?:-->|$)|<![^>]*>)'
+    r'|</?(?P<tag>[a-zA-Z][a-zA-Z0-9]*)[^>]*(?:>|$)'
+    r'|(?P<entity>&(?:#[0-9]+|#[xX][0-9a-fA-F]+|[a-zA-Z][a-zA-Z0-9]*);?)'
+    r'|(?P<text>[^<&]+|[<&])',
+    re.S | re.I,
+)
+# 这些标签前后换行，其余标签直接去掉
+BLOCK_TAGS = frozenset([
+    'br', 'p', 'div', 'li', 'ul', 'ol', 'tr', 'table', 'blockquote', 'pre',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'section', 'article',
+])
+
+def html_to_text(text, limit=None, ellipsis="...", newlines=True):
+    """
+    HTML 转纯文本
+    limit: 最多保留的字符数，超出时截断并加上 ellipsis
+    newlines: 块级标签 (<br> <p> <li> ...) 转成换行；False 时全部合并成一行
+    """
+    if not text:
+        return ""
+    if '<' not in text and '&' not in text:
+        # 纯文本：只需要合并空白和截断
+        result = " ".join(text.split())
+        if limit is not None and len(result) > limit:
+            return result[:limit].rstrip() + ellipsis
+        return result
+    out = []
+    size = 0
+    pending = None  # 上一段文本之后待输出的分隔符: ' ' 或 '\n'
+    for m in _TOKEN_RE.finditer(text):
+        kind = m.lastgroup
+        if kind == 'text':
+            chunk = m.group('text')
+        elif kind == 'entity':
+            chunk = html.unescape(m.group('entity'))
+        elif kind == 'tag':
+            if out and m.group('tag').lower() in BLOCK_TAGS:
+                pending = '\n' if newlines else ' '
+            continue
+        else:
+            continue
+
+        # 合并空白：开头/结尾的空白变成待输出的分隔符，中间的压成一个空格
+        if chunk[:1].isspace() and out and pending is None:
+            pending = ' '
+        words = " ".join(chunk.split())
+        if words:
+            if pending and out:
+                out.append(pending)
+                size += 1
+            out.append(words)
+            size += len(words)
+            pending = None
+            if limit is not None and size > limit:
+                break
+        if chunk[-1:].isspace() and out and pending is None:
+            pending = ' '
+
+    result = "".join(out)
+    if limit is not None and len(result) > limit:
+        return result[:limit].rstrip() + ellipsis
+    return result
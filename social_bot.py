@@ -1,43 +1,48 @@
-import requests
-import os
+import http_client
+import feishu
+import registry
+import orchestrator
+import circuit
 import time
-import hmac
-import hashlib
-import base64
-import json
-import random
 
 # ================= 配置区域 =================
-FEISHU_WEBHOOK = os.getenv("FEISHU_WEBHOOK")
-FEISHU_SECRET = os.getenv("FEISHU_SECRET")
+# 飞书 Webhook / 密钥 由 feishu 模块统一从环境变量读取
+# oioweb 请求超时上限 (熔断器会按历史延迟自动收紧) 和官方备用源的超时
+OIOWEB_TIMEOUT = 15
+FALLBACK_TIMEOUT = 10
 # ===========================================
 
-def gen_sign(timestamp, secret):
-    string_to_sign = '{}\n{}'.format(timestamp, secret)
-    hmac_code = hmac.new(string_to_sign.encode("utf-8"), digestmod=hashlib.sha256).digest()
-    sign = base64.b64encode(hmac_code).decode('utf-8')
-    return sign
-
 def get_headers():
+    # User-Agent 由 http_client 统一设置，这里只补充 Referer
     return {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
         "Referer": "https://www.google.com"
     }
 
-def fetch_oioweb(type_key, title_name):
+def fetch_oioweb(type_key, title_name, reserve=0):
     """
     方案A: 调用 oioweb 聚合接口 (目前最稳)
     文档: https://api.oioweb.cn/doc/common/HotList
+    oioweb 连续挂掉时熔断，直接返回 None 让调用方走官方备用源，不再每次干等超时
+    reserve: 给备用源留出的秒数，剩余时间扣掉它不够请求一次 oioweb 就直接跳过
     """
+    timeout = circuit.timeout("oioweb", OIOWEB_TIMEOUT, reserve=reserve)
+    if timeout is None:
+        print(f"⏭️ 剩余时间不够请求 oioweb，跳过 {title_name}")
+        return None
+    if not circuit.allow("oioweb"):
+        print(f"⏭️ oioweb 熔断中，跳过 {title_name}")
+        return None
     print(f"🔄 正在尝试从 API 获取 {title_name} ...")
     url = f"https://api.oioweb.cn/api/common/HotList?type={type_key}"
     
+    start = time.monotonic()
     try:
-        resp = requests.get(url, headers=get_headers(), timeout=15)
+        resp = http_client.get(url, headers=get_headers(), timeout=timeout, retries=0)
         data = resp.json()
         
         # oioweb 的数据通常在 result 字段里
         if data.get('code') == 200:
+            circuit.record_success("oioweb", time.monotonic() - start)
             items = data.get('result', [])[:5]
             lines = []
             for i, item in enumerate(items):
@@ -53,10 +58,12 @@ def fetch_oioweb(type_key, title_name):
             return f"**{title_name}**\n" + "\n".join(lines)
         else:
             print(f"⚠️ {title_name} API 返回状态非200")
+            circuit.record_failure("oioweb", f"code {data.get('code')}")
             return None
             
     except Exception as e:
         print(f"❌ {title_name} API 抓取失败: {e}")
+        circuit.record_failure("oioweb", e)
         return None
 
 # ========================================
@@ -67,7 +74,7 @@ def get_bilibili_fallback():
     print("⚠️ 启用 B站 备用官方源...")
     url = "https://api.bilibili.com/x/web-interface/ranking/v2?rid=0&type=all"
     try:
-        resp = requests.get(url, headers=get_headers(), timeout=10)
+        resp = http_client.get(url, headers=get_headers(), timeout=FALLBACK_TIMEOUT)
         items = resp.json()['data']['list'][:5]
         lines = [f"{i+1}. [{item['title']}]({item['short_link_v2']}) `▶️{item['stat']['view']}`" for i, item in enumerate(items)]
         return "**📺 B站热门 (官方源)**\n" + "\n".join(lines)
@@ -77,7 +84,7 @@ def get_weibo_fallback():
     print("⚠️ 启用 微博 备用官方源...")
     url = "https://weibo.com/ajax/side/hotSearch"
     try:
-        resp = requests.get(url, headers=get_headers(), timeout=10)
+        resp = http_client.get(url, headers=get_headers(), timeout=FALLBACK_TIMEOUT)
         items = resp.json()['data']['realtime'][:5]
         lines = [f"{i+1}. [{item['word_scheme']}](https://s.weibo.com/weibo?q={item['word']})" for i, item in enumerate(items)]
         return "**🍉 微博热搜 (官方源)**\n" + "\n".join(lines)
@@ -85,58 +92,45 @@ def get_weibo_fallback():
 
 # ================= 主逻辑 =================
 
+@registry.source("social.bilibili")
 def get_bilibili():
     # 尝试 API -> 失败则尝试 官方
-    return fetch_oioweb("bilibili", "📺 B站热门") or get_bilibili_fallback()
+    return fetch_oioweb("bilibili", "📺 B站热门", reserve=FALLBACK_TIMEOUT) or get_bilibili_fallback()
 
+@registry.source("social.zhihu")
 def get_zhihu():
     # 知乎 oioweb 很稳
     return fetch_oioweb("zhihuHot", "🧠 知乎热榜")
 
+@registry.source("social.douyin")
 def get_douyin():
     # 抖音 oioweb 很稳
     return fetch_oioweb("douyinHot", "🎵 抖音热搜")
 
+@registry.source("social.weibo")
 def get_weibo():
     # 微博 API -> 官方
-    return fetch_oioweb("weibo", "🍉 微博热搜") or get_weibo_fallback()
+    return fetch_oioweb("weibo", "🍉 微博热搜", reserve=FALLBACK_TIMEOUT) or get_weibo_fallback()
 
 def send_to_feishu(content_list):
-    if not FEISHU_WEBHOOK: return
-    timestamp = str(int(time.time()))
-    sign = gen_sign(timestamp, FEISHU_SECRET)
-    
     valid_contents = [c for c in content_list if c]
     if not valid_contents: 
         print("所有接口都失败，取消推送")
         return
 
-    final_content = "\n\n----------------\n\n".join(valid_contents)
-    
-    payload = {
-        "timestamp": timestamp,
-        "sign": sign,
-        "msg_type": "interactive",
-        "card": {
-            "header": {
-                "title": {"tag": "plain_text", "content": "🔥 全网热榜 (Pro版)"},
-                "template": "red"
-            },
-            "elements": [
-                {"tag": "markdown", "content": final_content}
-            ]
-        }
-    }
-    requests.post(FEISHU_WEBHOOK, json=payload)
-    print("推送成功")
+    feishu.send_sections("🔥 全网热榜 (Pro版)", valid_contents, template="red")
 
-if __name__ == "__main__":
-    msgs = []
-    
-    # 依次获取
-    msgs.append(get_bilibili())
-    msgs.append(get_zhihu())
-    msgs.append(get_douyin())
-    msgs.append(get_weibo())
+def run():
+    # 并发获取 (超过 RUN_DEADLINE 还没返回的平台直接丢弃)，卡片保持下面的顺序
+    sources = [
+        ("Bilibili", get_bilibili),
+        ("Zhihu", get_zhihu),
+        ("Douyin", get_douyin),
+        ("Weibo", get_weibo),
+    ]
+    msgs, late = orchestrator.run_sources(sources)
     
     send_to_feishu(msgs)
+
+if __name__ == "__main__":
+    run()
@@ -1,26 +1,33 @@
-import akshare as ak
-import requests
+import feishu
+import registry
+import rate_limit
+import metrics
+import trade_store
 import os
 import time
-import pandas as pd
-import hmac
-import hashlib
-import base64
-import csv
-from datetime import datetime
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 
 # ================= 配置区域 =================
-FEISHU_WEBHOOK = os.getenv("FEISHU_WEBHOOK")
-FEISHU_SECRET = os.getenv("FEISHU_SECRET")
-CSV_FILE = "trade_history.csv" # 交易记录文件名
+# 飞书 Webhook / 密钥 由 feishu 模块统一从环境变量读取
+CSV_FILE = trade_store.CSV_FILE # 交易记录 CSV 导出视图
+# 扫描模式: top = 只看资金流入前 5 的板块; full = 扫描全部概念板块
+STOCK_SCAN_MODE = os.getenv("STOCK_SCAN_MODE", "top")
+STOCK_TOP_BOARDS = 5
+STOCK_SCAN_WORKERS = int(os.getenv("STOCK_SCAN_WORKERS", "8"))
+# 自适应限流: 初始 / 最低 / 最高 每秒请求数
+STOCK_SCAN_RATE = float(os.getenv("STOCK_SCAN_RATE", "2"))
+STOCK_SCAN_MIN_RATE = 0.5
+STOCK_SCAN_MAX_RATE = float(os.getenv("STOCK_SCAN_MAX_RATE", "10"))
+# 飞书卡片最多展示的板块数 (full 模式下全部板块都会写入 CSV)
+STOCK_CARD_BOARDS = 5
+# 卡片底部附带历史回测小结 (BACKTEST_SUMMARY=1 开启)，回看天数
+BACKTEST_SUMMARY = os.getenv("BACKTEST_SUMMARY") == "1"
+BACKTEST_LOOKBACK_DAYS = int(os.getenv("BACKTEST_LOOKBACK_DAYS", "60"))
+# 交易记录的列 (买入价/涨跌幅/成交额 为数值列)
+TRADE_COLUMNS = trade_store.TRADE_COLUMNS
 # ===========================================
 
-def gen_sign(timestamp, secret):
-    string_to_sign = '{}\n{}'.format(timestamp, secret)
-    hmac_code = hmac.new(string_to_sign.encode("utf-8"), digestmod=hashlib.sha256).digest()
-    sign = base64.b64encode(hmac_code).decode('utf-8')
-    return sign
-
 def format_number(num):
     try:
         n = float(num)
@@ -32,139 +39,213 @@ def format_number(num):
     except:
         return str(num)
 
-def save_to_csv(record_list):
+def _ak():
+    # akshare 导入要几秒 (还会连带导入 pandas 等)，只在真正抓数据时才导入
+    import akshare as ak
+    return ak
+
+def _ak_call(api, **kwargs):
     """
-    将选股记录保存到 CSV 文件
-    record_list item format: {Date, Time, Board, Type, Code, Name, Price, Change}
+    调用 akshare 接口，记一条 akshare 指标 (它不走 http_client，不记的话最重的上游在报表里看不到)
+    按接口名分组: python metrics.py --by host --kind akshare
     """
-    file_exists = os.path.isfile(CSV_FILE)
-    
-    # utf-8-sig 是为了让 Excel 打开时不乱码
-    with open(CSV_FILE, mode='a', newline='', encoding='utf-8-sig') as f:
-        fieldnames = ['日期', '时间', '板块', '类型', '代码', '名称', '买入价', '涨跌幅', '成交额']
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        
-        # 如果文件是新建的，先写表头
-        if not file_exists:
-            writer.writeheader()
-        
-        writer.writerows(record_list)
-    print(f"💾 已保存 {len(record_list)} 条回测记录到 {CSV_FILE}")
+    start = time.monotonic()
+    try:
+        result = getattr(_ak(), api)(**kwargs)
+    except Exception as e:
+        metrics.emit("akshare", host=api, status="error", error=str(e)[:200],
+                     latency_ms=round((time.monotonic() - start) * 1000, 1))
+        raise
+    metrics.emit("akshare", host=api, status="ok", items=len(result),
+                 latency_ms=round((time.monotonic() - start) * 1000, 1))
+    return result
+
+def save_records(records):
+    """
+    保存选股记录：写入按日期分区的列式存储，再从列式存储重新生成 CSV 导出视图
+    records: DataFrame，列为 TRADE_COLUMNS (价格/涨跌幅/成交额都是数值，不再存格式化后的字符串)
+    """
+    # 旧版 CSV 里的历史记录先迁移进来，否则回测看不到
+    trade_store.migrate_legacy(CSV_FILE)
+    trade_store.write_trades(records)
+    trade_store.export_csv(CSV_FILE)
+    print(f"💾 已保存 {len(records)} 条回测记录到 {trade_store.TRADE_STORE_DIR}/ 和 {CSV_FILE}")
+
+def fetch_board_cons(board_name, limiter):
+    """
+    抓取单个概念板块的成分股
+    返回 (df_cons, 耗时秒, 错误信息)
+    """
+    limiter.acquire()
+    start = time.monotonic()
+    try:
+        df_cons = _ak_call("stock_board_concept_cons_em", symbol=board_name)
+        limiter.on_success()
+        return df_cons, time.monotonic() - start, None
+    except Exception as e:
+        limiter.on_failure()
+        return None, time.monotonic() - start, str(e)
+
+def scan_boards(board_names):
+    """
+    有界线程池 + 自适应限流 并发抓取多个板块的成分股 (代替固定的 time.sleep(0.5))
+    返回与 board_names 同序的 [(df_cons, 耗时, 错误), ...]
+    """
+    limiter = rate_limit.AdaptiveRateLimiter(STOCK_SCAN_RATE, STOCK_SCAN_MIN_RATE, STOCK_SCAN_MAX_RATE)
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=STOCK_SCAN_WORKERS) as pool:
+        results = list(pool.map(metrics.bind(lambda name: fetch_board_cons(name, limiter)), board_names))
+    report_scan(board_names, results, time.monotonic() - start, limiter.rate)
+    return results
+
+def report_scan(board_names, results, elapsed, final_rate):
+    """
+    每个板块记一条 fetch 指标 (source=stock.<板块>，延迟 / 成败 / 成分股数)，
+    再打印扫描报告: 成功/失败数、延迟分布、最慢的板块和失败原因
+    """
+    for name, (df_cons, latency, err) in zip(board_names, results):
+        metrics.emit("fetch", source=f"stock.{name}", board=name, status="error" if err else "ok", error=err,
+                     latency_ms=round(latency * 1000, 1), items=len(df_cons) if df_cons is not None else None)
+    latencies = sorted(latency for _, latency, _ in results)
+    failures = [(name, err) for name, (_, _, err) in zip(board_names, results) if err]
+    if not latencies:
+        return
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"📊 扫描 {len(board_names)} 个板块，失败 {len(failures)} 个，用时 {elapsed:.1f}s，"
+          f"延迟 p50={p50:.2f}s p95={p95:.2f}s max={latencies[-1]:.2f}s，最终速率 {final_rate:.1f}/s")
+    slowest = sorted(zip(board_names, results), key=lambda x: x[1][1], reverse=True)[:3]
+    print("🐢 最慢板块: " + ", ".join(f"{name}({res[1]:.2f}s)" for name, res in slowest))
+    for name, err in failures:
+        print(f"⚠️ {name} 出错: {err}")
 
+def top_k_per_board(df, value_col, k):
+    """
+    所有板块一次性做组内 Top-K (向量化的组内排名，不逐行循环、不整表排序)
+    NaN 不参与排名，自然被排除
+    """
+    rank = df.groupby('板块序号', sort=False)[value_col].rank(method='first', ascending=False)
+    picked = df[rank <= k]
+    return picked.sort_values(['板块序号', value_col], ascending=[True, False])
+
+def select_stocks(boards, scan_results, flow_col):
+    """
+    把所有板块的成分股拼成一张表，向量化选出 龙头 / 补涨
+    返回 (records, board_info)
+      records: 数值型的选股记录 DataFrame
+      board_info: 成功抓到成分股的板块 [(板块名, 主力净流入), ...]，按资金流入排序
+    """
+    import pandas as pd
+    frames = []
+    board_info = []
+    for order, ((_, row), (df_cons, _, error)) in enumerate(zip(boards.iterrows(), scan_results)):
+        if error or df_cons is None or df_cons.empty:
+            continue  # 失败原因已经在扫描报告里打印过
+        frames.append(df_cons[['代码', '名称', '最新价', '涨跌幅', '成交额']].assign(板块=row['行业'], 板块序号=order))
+        board_info.append((row['行业'], row[flow_col]))
+    if not frames:
+        return pd.DataFrame(columns=TRADE_COLUMNS[2:]), board_info
+
+    df_all = pd.concat(frames, ignore_index=True)
+    for col in ('最新价', '涨跌幅', '成交额'):
+        df_all[col] = pd.to_numeric(df_all[col], errors='coerce')
+
+    # === A组: 龙头 === 每个板块涨幅最大的 3 只
+    leaders = top_k_per_board(df_all, '涨跌幅', 3).assign(类型='龙头')
+
+    # === B组: 补涨 === 涨幅在 (0, 3] 之间、成交额最大的 3 只
+    mask = (df_all['涨跌幅'] > 0) & (df_all['涨跌幅'] <= 3)
+    potentials = top_k_per_board(df_all[mask], '成交额', 3).assign(类型='补涨')
+
+    records = pd.concat([leaders, potentials], ignore_index=True)
+    records = records.sort_values('板块序号', kind='stable').rename(columns={'最新价': '买入价'})
+    return records, board_info
+
+def build_card_data(records, board_info):
+    """按资金流入顺序取前 STOCK_CARD_BOARDS 个有龙头的板块，卡片渲染时再格式化"""
+    card_data = []
+    by_board = {name: group for name, group in records.groupby('板块', sort=False)}
+    for board_name, net_inflow in board_info:
+        group = by_board.get(board_name)
+        if group is None or not (group['类型'] == '龙头').any():
+            continue
+        card_data.append({
+            "board_name": board_name,
+            "net_inflow": net_inflow,
+            "leaders": group[group['类型'] == '龙头'].to_dict('records'),
+            "potentials": group[group['类型'] == '补涨'].to_dict('records')
+        })
+        if len(card_data) >= STOCK_CARD_BOARDS:
+            break
+    return card_data
+
+@registry.source("stock.hot_stocks")
 def get_hot_stocks_strategy():
     print("🚀 正在执行选股策略...")
-    trade_records = [] # 用于存储要写入 CSV 的数据
-    feishu_results = [] # 用于飞书推送的数据
     
-    current_date = datetime.now().strftime("%Y-%m-%d")
-    current_time = datetime.now().strftime("%H:%M")
+    now = datetime.now()
 
     try:
         # 1. 获取资金流向板块
-        df_flow = ak.stock_fund_flow_concept(symbol="即时")
+        df_flow = _ak_call("stock_fund_flow_concept", symbol="即时")
         flow_col = "主力净流入-净额" if "主力净流入-净额" in df_flow.columns else "主力净流入"
         df_flow.sort_values(by=flow_col, ascending=False, inplace=True)
-        top_5_boards = df_flow.head(5)
-        
-        for _, row in top_5_boards.iterrows():
-            board_name = row['行业']
-            net_inflow = row[flow_col]
-            board_change = row['涨跌幅']
-            
-            try:
-                df_cons = ak.stock_board_concept_cons_em(symbol=board_name)
-                df_cons['涨跌幅'] = pd.to_numeric(df_cons['涨跌幅'], errors='coerce')
-                df_cons['成交额'] = pd.to_numeric(df_cons['成交额'], errors='coerce')
-                
-                # === A组: 龙头 ===
-                df_leaders = df_cons.sort_values(by="涨跌幅", ascending=False).head(3)
-                leaders_list = []
-                for _, stock in df_leaders.iterrows():
-                    leaders_list.append(f"🔥 {stock['名称']} (`{stock['涨跌幅']}%`)")
-                    # 记录到 CSV 数据列表
-                    trade_records.append({
-                        '日期': current_date,
-                        '时间': current_time,
-                        '板块': board_name,
-                        '类型': '龙头',
-                        '代码': stock['代码'],
-                        '名称': stock['名称'],
-                        '买入价': stock['最新价'],
-                        '涨跌幅': f"{stock['涨跌幅']}%",
-                        '成交额': format_number(stock['成交额'])
-                    })
-
-                # === B组: 补涨 ===
-                df_potential = df_cons[(df_cons['涨跌幅'] > 0) & (df_cons['涨跌幅'] <= 3)].copy()
-                df_potential.sort_values(by="成交额", ascending=False, inplace=True)
-                top_potential = df_potential.head(3)
-                
-                potential_list = []
-                for _, stock in top_potential.iterrows():
-                    amt = format_number(stock['成交额'])
-                    potential_list.append(f"🌱 {stock['名称']} (`{stock['涨跌幅']}%`) 额:{amt}")
-                    # 记录到 CSV 数据列表
-                    trade_records.append({
-                        '日期': current_date,
-                        '时间': current_time,
-                        '板块': board_name,
-                        '类型': '补涨',
-                        '代码': stock['代码'],
-                        '名称': stock['名称'],
-                        '买入价': stock['最新价'],
-                        '涨跌幅': f"{stock['涨跌幅']}%",
-                        '成交额': amt
-                    })
-
-                if leaders_list:
-                    feishu_results.append({
-                        "board_name": board_name,
-                        "board_info": f"流入: {format_number(net_inflow)}",
-                        "leaders": leaders_list,
-                        "potentials": potential_list if potential_list else ["(无符合标的)"]
-                    })
-                
-                time.sleep(0.5)
-                
-            except Exception as e:
-                print(f"⚠️ {board_name} 出错: {e}")
-                continue
+        boards = df_flow if STOCK_SCAN_MODE == "full" else df_flow.head(STOCK_TOP_BOARDS)
+
+        # 2. 并发抓取各板块成分股
+        scan_results = scan_boards(list(boards['行业']))
+
+        # 3. 所有板块一起向量化选股
+        records, board_info = select_stocks(boards, scan_results, flow_col)
+        records.insert(0, '日期', now.strftime("%Y-%m-%d"))
+        records.insert(1, '时间', now.strftime("%H:%M"))
         
-        # 循环结束后，统一保存 CSV
-        if trade_records:
-            save_to_csv(trade_records)
+        # 统一保存
+        if not records.empty:
+            save_records(records)
 
-        return feishu_results
+        return build_card_data(records, board_info)
 
     except Exception as e:
         print(f"❌ 策略执行失败: {e}")
         return []
 
-def send_to_feishu(data):
-    if not FEISHU_WEBHOOK: return
-    timestamp = str(int(time.time()))
-    sign = gen_sign(timestamp, FEISHU_SECRET)
-    
+def get_backtest_summary():
+    """回测最近 BACKTEST_LOOKBACK_DAYS 天的选股记录，返回卡片上的小结 (失败返回 None)"""
+    import backtest  # 只有打开回测小结时才需要
+    try:
+        start = (datetime.now() - timedelta(days=BACKTEST_LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+        _, by_type, by_board = backtest.run_backtest(start=start)
+        if by_type.empty:
+            return None
+        backtest.write_report(by_type, by_board)
+        return backtest.summary_markdown(by_type)
+    except Exception as e:
+        print(f"⚠️ 回测失败: {e}")
+        return None
+
+def send_to_feishu(data, backtest_summary=None):
     content_elements = []
     for i, item in enumerate(data):
-        section = f"**{i+1}. {item['board_name']}** *{item['board_info']}*\n" + \
-                  "**【龙头】**\n" + "\n".join(item['leaders']) + "\n" + \
-                  "**【补涨】**\n" + "\n".join(item['potentials'])
+        # 数值只在渲染卡片时才格式化
+        leaders = [f"🔥 {s['名称']} (`{s['涨跌幅']:.2f}%`)" for s in item['leaders']]
+        potentials = [f"🌱 {s['名称']} (`{s['涨跌幅']:.2f}%`) 额:{format_number(s['成交额'])}" for s in item['potentials']]
+        section = f"**{i+1}. {item['board_name']}** *流入: {format_number(item['net_inflow'])}*\n" + \
+                  "**【龙头】**\n" + "\n".join(leaders) + "\n" + \
+                  "**【补涨】**\n" + "\n".join(potentials or ["(无符合标的)"])
         content_elements.append(section)
+    if backtest_summary:
+        content_elements.append(backtest_summary)
     
-    final_content = "\n\n----------------\n\n".join(content_elements)
-    payload = {
-        "timestamp": timestamp, "sign": sign, "msg_type": "interactive",
-        "card": {
-            "header": {"title": {"tag": "plain_text", "content": f"📈 选股策略已归档"}, "template": "turquoise"},
-            "elements": [{"tag": "markdown", "content": final_content}]
-        }
-    }
-    requests.post(FEISHU_WEBHOOK, json=payload)
+    feishu.send_sections("📈 选股策略已归档", content_elements, template="turquoise")
 
-if __name__ == "__main__":
+def run():
     strategy_data = get_hot_stocks_strategy()
     if strategy_data:
-        send_to_feishu(strategy_data)
+        summary = get_backtest_summary() if BACKTEST_SUMMARY else None
+        send_to_feishu(strategy_data, summary)
     else:
         print("今日无数据")
+
+if __name__ == "__main__":
+    run()
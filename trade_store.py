@@ -0,0 +1,144 @@
+import argparse
+import os
+import re
+from datetime import datetime
+
+# 选股记录的列式存储：
+#   trade_history/date=2024-01-02/part-093012.parquet
+# 按日期分区、只追加，每次运行写一个新文件，不再重写整份 CSV；
+# 读取时只打开指定日期范围的分区、只解码需要的列。
+# trade_history.csv 作为导出视图保留 (Excel 直接打开)，每次写入后从列式存储重新生成；
+# 列式存储出现之前的旧 CSV 在第一次写入前整体迁移进来 (migrate_legacy)
+# pandas 在用到的函数里才导入，只 import 本模块 (比如读取 TRADE_COLUMNS) 不付导入开销
+
+# ================= 配置 =================
+TRADE_STORE_DIR = os.getenv("TRADE_STORE_DIR", "trade_history")
+CSV_FILE = "trade_history.csv"
+TRADE_COLUMNS = ['日期', '时间', '板块', '类型', '代码', '名称', '买入价', '涨跌幅', '成交额']
+NUMERIC_COLUMNS = ['买入价', '涨跌幅', '成交额']
+# =======================================
+
+PARTITION_RE = re.compile(r'^date=(\d{4}-\d{2}-\d{2})$')
+
+def _normalize(records):
+    """统一列顺序和类型：数值列 float64，其余列 str"""
+    import pandas as pd
+    df = records[TRADE_COLUMNS].copy()
+    for col in NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+    for col in TRADE_COLUMNS:
+        if col not in NUMERIC_COLUMNS:
+            df[col] = df[col].astype(str)
+    return df
+
+def write_trades(records):
+    """
+    追加一批选股记录，每个日期写一个新的 parquet 分片
+    返回写入的文件路径列表
+    """
+    if records is None or records.empty:
+        return []
+    df = _normalize(records)
+    paths = []
+    stamp = datetime.now().strftime("%H%M%S%f")
+    for date, part in df.groupby('日期', sort=True):
+        part_dir = os.path.join(TRADE_STORE_DIR, f"date={date}")
+        os.makedirs(part_dir, exist_ok=True)
+        path = os.path.join(part_dir, f"part-{stamp}.parquet")
+        part.to_parquet(path, index=False, compression='zstd')
+        paths.append(path)
+    return paths
+
+def list_partitions(start=None, end=None):
+    """列出 [start, end] 日期范围内的分区 (日期字符串 YYYY-MM-DD，包含两端)"""
+    if not os.path.isdir(TRADE_STORE_DIR):
+        return []
+    partitions = []
+    for name in sorted(os.listdir(TRADE_STORE_DIR)):
+        m = PARTITION_RE.match(name)
+        if not m:
+            continue
+        date = m.group(1)
+        if (start and date < start) or (end and date > end):
+            continue
+        partitions.append((date, os.path.join(TRADE_STORE_DIR, name)))
+    return partitions
+
+def load_trades(start=None, end=None, columns=None):
+    """
+    读取选股记录
+    start / end: 'YYYY-MM-DD'，只读这个范围内的分区
+    columns: 只读取这些列 (列式存储，未选中的列不会被解码)
+    """
+    import pandas as pd
+    columns = list(columns) if columns else list(TRADE_COLUMNS)
+    frames = []
+    for _, part_dir in list_partitions(start, end):
+        for name in sorted(os.listdir(part_dir)):
+            if name.endswith(".parquet"):
+                frames.append(pd.read_parquet(os.path.join(part_dir, name), columns=columns))
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+def export_csv(csv_file=CSV_FILE, start=None, end=None):
+    """从列式存储重新生成 CSV 导出视图"""
+    df = load_trades(start, end)
+    # utf-8-sig 是为了让 Excel 打开时不乱码
+    df.to_csv(csv_file, index=False, encoding='utf-8-sig')
+    print(f"📤 已导出 {len(df)} 条记录到 {csv_file}")
+    return len(df)
+
+def _parse_legacy_number(value):
+    """旧版 CSV 里存的是格式化字符串: '3.2%' / '1.5亿' / '8万'"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip().rstrip('%')
+    scale = 1
+    if text.endswith('亿'):
+        text, scale = text[:-1], 100000000
+    elif text.endswith('万'):
+        text, scale = text[:-1], 10000
+    try:
+        return float(text) * scale
+    except ValueError:
+        return float('nan')
+
+def import_csv(csv_file=CSV_FILE):
+    """
+    把 CSV 导入列式存储 (兼容旧版格式化字符串)
+    已经有分区的日期整天跳过，重复导入 / 导入导出视图本身都不会产生重复记录
+    """
+    import pandas as pd
+    df = pd.read_csv(csv_file, encoding='utf-8-sig', dtype=str)
+    existing = {date for date, _ in list_partitions()}
+    skipped = df['日期'].isin(existing)
+    df = df[~skipped]
+    for col in NUMERIC_COLUMNS:
+        df[col] = df[col].map(_parse_legacy_number)
+    paths = write_trades(df)
+    print(f"📥 已导入 {len(df)} 条记录，写入 {len(paths)} 个分区 (跳过已有日期的 {int(skipped.sum())} 条)")
+    return len(df)
+
+def migrate_legacy(csv_file=CSV_FILE):
+    """列式存储还是空的、但有旧版 CSV 时，先把旧记录整体导入 (只在第一次写入前发生一次)"""
+    if list_partitions() or not os.path.isfile(csv_file):
+        return 0
+    print(f"📦 首次使用列式存储，迁移旧版 {csv_file}")
+    return import_csv(csv_file)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="选股记录列式存储工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_export = sub.add_parser("export", help="重新生成 CSV 导出视图")
+    p_export.add_argument("--start")
+    p_export.add_argument("--end")
+    p_export.add_argument("--output", default=CSV_FILE)
+    p_import = sub.add_parser("import", help="导入已有的 CSV")
+    p_import.add_argument("csv_file", nargs="?", default=CSV_FILE)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_csv(args.output, args.start, args.end)
+    else:
+        import_csv(args.csv_file)
@@ -1,37 +1,36 @@
-import requests
-import feedparser
+import http_client
+import feishu
+import registry
+import local_store
+import metrics
+import orchestrator
+import feed_cache
+import sanitize
 import os
 import time
-import hmac
-import hashlib
-import base64
-import re
-from bs4 import BeautifulSoup
 from datetime import datetime
 
 # ================= 配置 =================
-FEISHU_WEBHOOK = os.getenv("FEISHU_WEBHOOK")
-FEISHU_SECRET = os.getenv("FEISHU_SECRET")
+# 历史上的今天：月度数据缓存有效期 (秒) 和按天索引文件
+HISTORY_TTL = 7 * 24 * 60 * 60
+HISTORY_DAY_INDEX = "history/days.json"
+# 微博热搜取前几条 (榜单第一行是置顶，不算在内)
+WEIBO_TOP_N = 10
 # =======================================
 
-def gen_sign(timestamp, secret):
-    string_to_sign = '{}\n{}'.format(timestamp, secret)
-    hmac_code = hmac.new(string_to_sign.encode("utf-8"), digestmod=hashlib.sha256).digest()
-    sign = base64.b64encode(hmac_code).decode('utf-8')
-    return sign
-
+@registry.source("trend.product_hunt")
 def get_product_hunt():
     """获取 Product Hunt 今日最佳产品"""
     print("正在获取 Product Hunt...")
     url = "https://www.producthunt.com/feed"
     try:
-        feed = feedparser.parse(url)
+        feed = feed_cache.fetch_feed(url, timeout=10)
         products = []
         for entry in feed.entries[:5]: # 取前5个
             title = entry.title
             link = entry.link
             # 简短描述
-            desc = entry.summary.split('<br')[0][:100].replace('\n', ' ')
+            desc = sanitize.html_to_text(entry.summary.split('<br')[0], limit=100, ellipsis="", newlines=False)
             products.append(f"🚀 **{title}**\n> {desc}\n[查看产品]({link})")
             
         return "**🦄 Product Hunt Daily**\n" + "\n\n".join(products)
@@ -39,41 +38,97 @@ def get_product_hunt():
         print(f"PH Error: {e}")
         return None
 
+@registry.source("trend.weibo_hot")
 def get_weibo_hot():
     """获取微博热搜 Top 10"""
     print("正在获取微博热搜...")
     url = "https://s.weibo.com/top/summary"
     headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
         "Cookie": "SUB=1" # 简单的游客 Cookie 绕过验证
     }
     try:
-        resp = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(resp.text, 'lxml')
-        items = soup.select('td.td-02 > a')
+        resp = http_client.get(url, headers=headers, timeout=10)
+        rows = parse_weibo_hot(resp.text)
         
         hot_list = []
-        # 跳过第0个（通常是置顶广告），从第1个开始取
-        for i, item in enumerate(items[1:11]): 
-            title = item.get_text().strip()
-            link = "https://s.weibo.com" + item.get('href')
-            # 热度值
-            hot_val = item.find_next_sibling('span')
-            hot_text = hot_val.get_text().strip() if hot_val else ""
+        for i, (title, href, hot_text) in enumerate(rows):
+            link = "https://s.weibo.com" + href
             
             # 前3名加火苗图标
             icon = "🔥" if i < 3 else str(i+1) + "."
             
             hot_list.append(f"{icon} [{title}]({link}) `{hot_text}`")
             
-        return "**🍉 微博热搜 Top 10**\n" + "\n".join(hot_list)
+        return f"**🍉 微博热搜 Top {WEIBO_TOP_N}**\n" + "\n".join(hot_list)
     except Exception as e:
         print(f"Weibo Error: {e}")
         return None
 
+def parse_weibo_hot(html, top_n=WEIBO_TOP_N, chunk_size=16 * 1024):
+    """
+    解析热搜榜，返回 [(标题, 链接路径, 热度), ...]
+    不再把整页 (大半是脚本和样式) 建成 BeautifulSoup 树：
+    从榜单容器开始把 HTML 分块喂给 lxml 的增量解析器，只关心 <tr> 结束事件，
+    拿够置顶 + top_n 行就停止，后面的内容不再解析
+    """
+    from lxml import etree  # 只有这个来源用到，用到时才导入
+    start = html.find('id="pl_top_realtimehot"')
+    if start != -1:
+        start = html.rfind('<', 0, start)
+    html = html[max(start, 0):]
+
+    parser = etree.HTMLPullParser(events=("end",), tag="tr")
+    rows = []
+    for pos in range(0, len(html), chunk_size):
+        parser.feed(html[pos:pos + chunk_size])
+        for _, tr in parser.read_events():
+            for td in tr:
+                if "td-02" in (td.get("class") or "").split():
+                    link = td.find("a")
+                    if link is not None and link.get("href"):
+                        # 热度值
+                        hot_val = next(link.itersiblings("span"), None)
+                        hot_text = "".join(hot_val.itertext()).strip() if hot_val is not None else ""
+                        rows.append(("".join(link.itertext()).strip(), link.get("href"), hot_text))
+                    break
+            tr.clear()
+            # 跳过第0个（通常是置顶广告），再取 top_n 个
+            if len(rows) > top_n:
+                return rows[1:top_n + 1]
+    return rows[1:top_n + 1]
+
+def load_history_month(month):
+    """
+    读取百度百科某个月的数据 (本地缓存 HISTORY_TTL 秒内不重复下载)
+    换月时顺带清掉其他月份的缓存
+    """
+    cache_name = f"history/month-{month}.json"
+    cached = local_store.load_json(cache_name)
+    if cached and time.time() - cached.get("fetched_at", 0) < HISTORY_TTL:
+        return cached["data"]
+
+    # 请求百度百科官方接口 (按月存储的静态JSON，速度快且稳定)
+    url = f"https://baike.baidu.com/cms/home/eventsOnHistory/{month}.json"
+    resp = http_client.get(url, timeout=5)
+    resp.encoding = 'utf-8' # 强制编码，防止中文乱码
+    all_data = resp.json()
+
+    # 百度的数据结构是: { "01": { "0101": [ ...events... ] } }，只留当月部分
+    data = all_data.get(month, {})
+    if not data:
+        return data  # 接口改版 / 返回空时不缓存，下次运行重新下载
+    local_store.save_json(cache_name, {"fetched_at": time.time(), "data": data})
+    history_dir = local_store.cache_path("history", "")
+    for name in os.listdir(history_dir):
+        if name.startswith("month-") and name != f"month-{month}.json":
+            os.remove(os.path.join(history_dir, name))
+    return data
+
+@registry.source("trend.history_today")
 def get_history_today():
     """
     获取历史上的今天 (稳定版 - 数据源: 百度百科)
+    月度数据和当天清洗好的结果都缓存在本地，大多数日子不需要联网
     """
     print("正在获取历史上的今天...")
     try:
@@ -83,82 +138,64 @@ def get_history_today():
         day = now.strftime("%d")   # 例如 "01"
         date_key = month + day     # 例如 "0101"
 
-        # 2. 请求百度百科官方接口 (按月存储的静态JSON，速度快且稳定)
-        url = f"https://baike.baidu.com/cms/home/eventsOnHistory/{month}.json"
-        
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        
-        resp = requests.get(url, headers=headers, timeout=5)
-        resp.encoding = 'utf-8' # 强制编码，防止中文乱码
-        all_data = resp.json()
-        
-        # 3. 定位到“今天”的数据
-        # 百度的数据结构是: { "01": { "0101": [ ...events... ] } }
-        today_events = all_data.get(month, {}).get(date_key, [])
-        
-        if not today_events:
-            return "**⏳ 历史上的今天**\n暂无数据"
+        # 2. 先查按天索引：命中就直接用清洗好的结果
+        day_index = local_store.load_json(HISTORY_DAY_INDEX, {})
+        display_list = day_index.get(date_key)
 
-        # 4. 清洗和筛选数据
-        # 定义一个去除 HTML 标签的小函数
-        def clean_text(text):
-            text = re.sub(r'<.*?>', '', text) # 去掉 <a href...> 这种标签
-            text = text.replace('&nbsp;', ' ').strip()
-            return text
-
-        display_list = []
-        # 百度数据通常按年份排序。
-        # 策略：取最后 5 条（也就是离现在最近的年份），或者反转列表取最著名的
-        # 这里我们取倒数5条，通常是近代史，大家比较熟悉
-        for item in today_events[-5:]:
-            year = item.get('year')
-            title = clean_text(item.get('title'))
-            # 简单排版
-            display_list.append(f"📜 **{year}年**: {title}")
-            
-        # 再反转一下，让最近的年份在最上面
-        display_list.reverse()
+        if display_list is None:
+            # 3. 定位到“今天”的数据
+            today_events = load_history_month(month).get(date_key, [])
+
+            # 4. 清洗和筛选数据
+            display_list = []
+            # 百度数据通常按年份排序。
+            # 策略：取最后 5 条（也就是离现在最近的年份），或者反转列表取最著名的
+            # 这里我们取倒数5条，通常是近代史，大家比较熟悉
+            for item in today_events[-5:]:
+                year = item.get('year')
+                # 去除 HTML 标签 (例如 <a href...>) 和 &nbsp;
+                title = sanitize.html_to_text(item.get('title'))
+                # 简单排版
+                display_list.append(f"📜 **{year}年**: {title}")
+                
+            # 再反转一下，让最近的年份在最上面
+            display_list.reverse()
+
+            # 索引只保留当月的日期，换月时旧条目自然被淘汰；
+            # 空结果 (抓取失败 / 页面改版) 不写入，否则这一天整年都是空的
+            if display_list:
+                day_index = {k: v for k, v in day_index.items() if k.startswith(month)}
+                day_index[date_key] = display_list
+                local_store.save_json(HISTORY_DAY_INDEX, day_index)
+
+        if not display_list:
+            return "**⏳ 历史上的今天**\n暂无数据"
 
         return f"**⏳ 历史上的今天 ({month}月{day}日)**\n" + "\n".join(display_list)
 
     except Exception as e:
         print(f"History Error: {e}")
+        metrics.mark_failed(e)
         # 返回错误信息，这样你能在飞书看到是哪里错了，而不是什么都没有
         return f"**⏳ 历史上的今天**\n数据获取异常: {str(e)[:50]}"
 
 def send_to_feishu(content_list):
-    if not FEISHU_WEBHOOK: return
-    timestamp = str(int(time.time()))
-    sign = gen_sign(timestamp, FEISHU_SECRET)
-    
     valid_contents = [c for c in content_list if c]
     if not valid_contents: return
 
-    final_content = "\n\n----------------\n\n".join(valid_contents)
+    # 橙色代表活力
+    feishu.send_sections("🌈 每日趋势 & 灵感", valid_contents, template="orange")
+
+def run():
+    # 并发抓取，整体受 RUN_DEADLINE 约束，卡片按这里的顺序排列
+    sources = [
+        ("Weibo", get_weibo_hot),           # 吃瓜/热点
+        ("ProductHunt", get_product_hunt),  # 产品灵感
+        ("History", get_history_today),     # 历史底蕴
+    ]
+    msgs, late = orchestrator.run_sources(sources)
     
-    payload = {
-        "timestamp": timestamp,
-        "sign": sign,
-        "msg_type": "interactive",
-        "card": {
-            "header": {
-                "title": {"tag": "plain_text", "content": "🌈 每日趋势 & 灵感"},
-                "template": "orange" # 橙色代表活力
-            },
-            "elements": [
-                {"tag": "markdown", "content": final_content}
-            ]
-        }
-    }
-    requests.post(FEISHU_WEBHOOK, json=payload)
-    print("推送成功")
+    send_to_feishu(msgs)
 
 if __name__ == "__main__":
-    msgs = []
-    msgs.append(get_weibo_hot())    # 吃瓜/热点
-    msgs.append(get_product_hunt()) # 产品灵感
-    msgs.append(get_history_today())# 历史底蕴
-    
-    send_to_feishu(msgs)
\ No newline at end of file
+    run()
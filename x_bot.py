@@ -1,15 +1,21 @@
-import requests
-import feedparser
+import http_client
+import feishu
+import registry
+import local_store
+import metrics
+import circuit
+import rate_limit
+import sanitize
+import feed_cache
 import os
+import re
 import time
-import hmac
-import hashlib
-import base64
 import random
+import requests
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 # ================= 配置区域 =================
-FEISHU_WEBHOOK = os.getenv("FEISHU_WEBHOOK")
-FEISHU_SECRET = os.getenv("FEISHU_SECRET")
+# 飞书 Webhook / 密钥 由 feishu 模块统一从环境变量读取
 
 # 【关注名单】你想监控的大佬 (填他们的推特 ID，不带 @)
 TARGET_USERS = [
@@ -27,73 +33,197 @@ NITTER_INSTANCES = [
     "https://nitter.soopy.moe",
     "https://nitter.uni-sonia.com"
 ]
+
+# 【限流】每个 Nitter 节点每秒最多请求数 / 允许的突发数，以及总并发线程数
+NITTER_RATE = float(os.getenv("NITTER_RATE", "1"))
+NITTER_BURST = int(os.getenv("NITTER_BURST", "2"))
+X_MAX_WORKERS = int(os.getenv("X_MAX_WORKERS", "16"))
+
+# 【节点熔断】每个节点的成败和延迟由 circuit 跨运行记录 (.cache/circuits.json)，
+# 连续失败的节点冷却一段时间不再探测，探测 / 抓取的超时按节点的历史延迟自动收紧
+NITTER_PROBE_TIMEOUT = 3
+# 第一个健康节点响应后，再等多久收集其他健康节点 (秒)
+NITTER_RACE_GRACE = 0.3
+NITTER_RSS_TIMEOUT = 10
+# 每个用户每次最多推送几条新推文 (游标记录已推送的最大推文 ID，只推比它新的)
+X_MAX_NEW_PER_USER = int(os.getenv("X_MAX_NEW_PER_USER", "3"))
 # ===========================================
 
-def gen_sign(timestamp, secret):
-    string_to_sign = '{}\n{}'.format(timestamp, secret)
-    hmac_code = hmac.new(string_to_sign.encode("utf-8"), digestmod=hashlib.sha256).digest()
-    sign = base64.b64encode(hmac_code).decode('utf-8')
-    return sign
+def circuit_key(url):
+    """节点在熔断器里的名字，比如 nitter:nitter.poast.org"""
+    return "nitter:" + url.split("://", 1)[-1]
 
-def get_working_instance():
-    """随机选择一个能用的 Nitter 节点"""
-    random.shuffle(NITTER_INSTANCES)
-    for url in NITTER_INSTANCES:
-        try:
-            # 简单测试一下连通性
-            requests.get(url, timeout=3)
-            print(f"✅ 选中节点: {url}")
-            return url
-        except:
-            continue
+def rank_instances():
+    """
+    按历史表现给节点排序：已知可用的按延迟中位数从低到高，其次是没探测过的，
+    熔断中的节点直接跳过 (全部都在熔断时才拿出来重试)
+    """
+    candidates = [url for url in NITTER_INSTANCES if circuit.state(circuit_key(url)) != "open"]
+    if not candidates:
+        candidates = list(NITTER_INSTANCES)
+    random.shuffle(candidates)  # 同分的节点随机打散
+    def score(url):
+        latency = circuit.latency(circuit_key(url))
+        return (latency is None, latency or 0)
+    return sorted(candidates, key=score)
+
+def probe_instance(url):
+    """探测单个节点 (结果记进熔断器)，可用返回延迟(秒)，不可用返回 None"""
+    key = circuit_key(url)
+    timeout = circuit.timeout(key, NITTER_PROBE_TIMEOUT)
+    if timeout is None:
+        return None  # 剩余时间不够，不探测也不记失败
+    start = time.monotonic()
+    try:
+        resp = http_client.get(url, timeout=timeout, retries=0)
+        if resp.status_code < 500:
+            latency = time.monotonic() - start
+            circuit.record_success(key, latency)
+            return latency
+        error = f"HTTP {resp.status_code}"
+    except Exception as e:
+        error = e
+    circuit.record_failure(key, error)
     return None
 
+def get_healthy_instances():
+    """
+    并发探测节点 (跳过熔断中的)，第一个健康节点响应后只再等 NITTER_RACE_GRACE 秒收集其他健康节点，
+    不等挂掉的节点超时 (它们在后台跑完，结果照样记进熔断器)
+    返回可用节点列表，按延迟从低到高排序
+    """
+    ranked = rank_instances()
+    pool = ThreadPoolExecutor(max_workers=len(ranked))
+    healthy = []
+    try:
+        futures = {pool.submit(metrics.bind(probe_instance), url): url for url in ranked}
+        pending = set(futures)
+        grace_end = None
+        while pending:
+            timeout = None if grace_end is None else max(0, grace_end - time.monotonic())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                break  # 宽限期到了，剩下的节点不等了
+            healthy += [(f.result(), futures[f]) for f in done if f.result() is not None]
+            if healthy and grace_end is None:
+                grace_end = time.monotonic() + NITTER_RACE_GRACE
+    finally:
+        # 不等还没返回的探测，它们最多 NITTER_PROBE_TIMEOUT 秒后自己结束
+        pool.shutdown(wait=False)
+
+    healthy = [url for _, url in sorted(healthy)]
+    skipped = len(NITTER_INSTANCES) - len(ranked)
+    print(f"✅ 可用节点 {len(healthy)}/{len(NITTER_INSTANCES)} (熔断中跳过 {skipped} 个): {healthy}")
+    return healthy
+
+STATUS_ID_RE = re.compile(r'/status/(\d+)')
+
+def tweet_id(entry):
+    """从推文链接里取出推文 ID (不同 Nitter 节点域名不同，但 ID 一样，而且随时间递增)"""
+    m = STATUS_ID_RE.search(entry.get('link', '') or entry.get('id', ''))
+    return int(m.group(1)) if m else None
+
 def fetch_user_tweets(base_url, user):
-    """抓取单个用户的最新推文"""
+    """
+    抓取单个用户上次推送之后的新推文 (新的在前)
+    节点出错 / 熔断中返回 None (换节点重试)；没有新推文返回 []
+    只有网络错误和 HTTP 错误记进节点的熔断器，账号为空 / 被封这种内容问题不算节点故障
+    """
     # Nitter 的 RSS 地址格式: https://nitter.net/username/rss
     rss_url = f"{base_url}/{user['id']}/rss"
     
     print(f"正在抓取 {user['name']} (@{user['id']})...")
+    key = circuit_key(base_url)
     try:
+        # 按节点限流 (令牌桶)，取代以前固定的 time.sleep(1)；重试也要各取一个令牌，429 时不会超发
+        bucket = rate_limit.get_bucket(base_url, NITTER_RATE, NITTER_BURST)
         # 必须带 Header，否则有些 Nitter 会拒绝
-        headers = {'User-Agent': 'Mozilla/5.0 (Compatible; RSS Bot)'}
-        feed = feedparser.parse(rss_url, request_headers=headers)
+        headers = {'User-Agent': http_client.RSS_BOT_UA}
+        timeout = circuit.timeout(key, NITTER_RSS_TIMEOUT)
+        if timeout is None:
+            print(f"⏭️ 剩余时间不够抓取 {user['name']}")
+            return None
+        # 探测之后节点可能已经熔断 (其他用户的请求失败了)，每次请求前都要问一下熔断器
+        if not circuit.allow(key):
+            print(f"⏭️ {base_url} 熔断中，{user['name']} 换下一个节点")
+            return None
+        try:
+            feed = feed_cache.fetch_feed(rss_url, headers=headers, timeout=timeout, limiter=bucket, retries=0)
+        except requests.RequestException as e:
+            print(f"❌ {user['name']} 抓取失败: {e}")
+            circuit.record_failure(key, e)
+            return None
+        circuit.record_success(key)
         
         if not feed.entries:
+            # 节点正常返回了空 feed (账号为空 / 被封，或者这个节点拿不到)，换个节点再试
+            print(f"💤 {user['name']} 在 {base_url} 上没有内容")
             return None
 
-        # 只取最新的一条
-        latest_tweet = feed.entries[0]
-        
-        # 简单的去重/时间判断逻辑 (实际使用建议存文件比对 ID)
-        # 这里演示：直接获取内容
-        content = latest_tweet.summary.replace('<br>', '\n')
-        # 去掉 HTML 标签 (简单处理)
-        import re
-        content = re.sub(r'<.*?>', '', content)
-        
-        # 截取前 150 字
-        if len(content) > 150:
-            content = content[:150] + "..."
+        cursor_key = f"x.{user['id']}"
+        last_id = local_store.load_cursor(cursor_key)
+        # 置顶推文可能排在最前面，所以不能遇到旧推文就停，逐条按 ID 比较
+        entries = [(tid, entry) for tid, entry in ((tweet_id(e), e) for e in feed.entries) if tid is not None]
+        if not entries:
+            return None
+        fresh = sorted((item for item in entries if last_id is None or item[0] > last_id),
+                       key=lambda item: item[0], reverse=True)
+        # 第一次运行没有游标，只推最新一条，避免把整个时间线刷屏
+        fresh = fresh[:1] if last_id is None else fresh[:X_MAX_NEW_PER_USER]
+        local_store.stage_cursor(cursor_key, max([tid for tid, _ in entries] + [last_id or 0]))
+
+        tweets = []
+        for _, entry in fresh:
+            # 去掉 HTML 标签，截取前 150 字
+            content = sanitize.html_to_text(entry.summary, limit=150)
             
-        return {
-            "author": user['name'],
-            "tag": user['tag'],
-            "content": content,
-            "link": latest_tweet.link,
-            "date": latest_tweet.published
-        }
+            tweets.append({
+                "author": user['name'],
+                "tag": user['tag'],
+                "content": content,
+                "link": entry.link,
+                "date": entry.published
+            })
+        if not tweets:
+            print(f"💤 {user['name']} 没有新推文")
+        return tweets
         
     except Exception as e:
-        print(f"❌ {user['name']} 抓取失败: {e}")
+        # 解析出错之类的问题，节点本身没毛病，不记熔断
+        print(f"❌ {user['name']} 解析失败: {e}")
         return None
 
+def fetch_with_failover(instances, index, user):
+    """
+    用户按序号轮流分配到各个健康节点上；分到的节点失败时依次换下一个节点
+    """
+    for offset in range(len(instances)):
+        base_url = instances[(index + offset) % len(instances)]
+        tweets = fetch_user_tweets(base_url, user)
+        if tweets is not None:
+            return tweets
+    return []
+
+def fetch_all_users(instances, users):
+    """并发抓取所有关注用户，结果保持 TARGET_USERS 的顺序"""
+    workers = max(1, min(X_MAX_WORKERS, http_client.POOL_SIZE, len(users)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        per_user = list(pool.map(metrics.bind(lambda args: fetch_with_failover(instances, *args)), enumerate(users)))
+    return [t for tweets in per_user for t in tweets]
+
+@registry.source("x.timeline")
+def get_all_tweets():
+    """探测可用节点并抓取全部关注用户上次推送之后的新推文"""
+    instances = get_healthy_instances()
+    if not instances:
+        print("❌ 所有 Nitter 节点都无法连接，请稍后再试")
+        return []
+    # 礼貌抓取由每个节点的令牌桶保证，用户分散到所有健康节点并发抓取
+    return fetch_all_users(instances, TARGET_USERS)
+
 def send_to_feishu(tweets):
-    if not FEISHU_WEBHOOK: return
-    timestamp = str(int(time.time()))
-    sign = gen_sign(timestamp, FEISHU_SECRET)
-    
-    if not tweets: return
+    """推送卡片，进了发件箱返回 True"""
+    if not tweets: return False
 
     # 拼接卡片
     card_elements = []
@@ -101,37 +231,15 @@ def send_to_feishu(tweets):
         text = f"**【{t['tag']}】{t['author']}**\n> {t['content']}\n[查看原文]({t['link']})"
         card_elements.append(text)
 
-    final_content = "\n\n----------------\n\n".join(card_elements)
-    
-    payload = {
-        "timestamp": timestamp,
-        "sign": sign,
-        "msg_type": "interactive",
-        "card": {
-            "header": {
-                "title": {"tag": "plain_text", "content": "🐦 X (Twitter) 重点监控"},
-                "template": "blue"
-            },
-            "elements": [
-                {"tag": "markdown", "content": final_content}
-            ]
-        }
-    }
-    requests.post(FEISHU_WEBHOOK, json=payload)
-    print("推送成功")
+    return feishu.send_sections("🐦 X (Twitter) 重点监控", card_elements, template="blue")
 
-if __name__ == "__main__":
-    base_url = get_working_instance()
-    
-    if base_url:
-        all_tweets = []
-        for user in TARGET_USERS:
-            tweet = fetch_user_tweets(base_url, user)
-            if tweet:
-                all_tweets.append(tweet)
-            # 礼貌抓取，避免对节点造成太大压力
-            time.sleep(1)
-            
-        send_to_feishu(all_tweets)
+def run():
+    all_tweets = get_all_tweets()
+    if send_to_feishu(all_tweets):
+        # 卡片已进发件箱，游标可以前移了
+        local_store.commit_cursors()
     else:
-        print("❌ 所有 Nitter 节点都无法连接，请稍后再试")
\ No newline at end of file
+        local_store.discard_cursors()
+
+if __name__ == "__main__":
+    run()